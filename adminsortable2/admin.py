@@ -1,18 +1,25 @@
+import hashlib
 import json
+import warnings
+from bisect import bisect_left, bisect_right
+from contextvars import ContextVar
 from pathlib import Path
-from itertools import chain
-from types import MethodType
 
 from django import VERSION as DJANGO_VERSION
 from django.conf import settings
 from django.contrib import admin, messages
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.templatetags.admin_list import items_for_result
 from django.contrib.contenttypes.forms import BaseGenericInlineFormSet
 from django.contrib.contenttypes.models import ContentType
-from django.core.exceptions import ImproperlyConfigured, FieldDoesNotExist
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import EmptyResultSet, ImproperlyConfigured, FieldDoesNotExist, ValidationError
 from django.core.paginator import EmptyPage
 from django.db import router, transaction, models
-from django.db.models import OrderBy
-from django.db.models.aggregates import Max
+from django.db.models import Case, Count, OrderBy, Q, When
+from django.db.models.aggregates import Max, Min
 from django.db.models.expressions import BaseExpression, F
 from django.db.models.functions import Coalesce
 from django.db.models.signals import post_save, pre_save
@@ -20,13 +27,34 @@ from django.db.utils import IntegrityError
 from django.forms import widgets
 from django.forms.fields import IntegerField
 from django.forms.models import BaseInlineFormSet
-from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, HttpResponseForbidden
+from django.http import (
+    HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, HttpResponseForbidden, JsonResponse,
+)
+from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 from django.urls import path, reverse
 
+from adminsortable2.allocators import MaxOrderAllocator
+from adminsortable2.instrumentation import count_rows, measure
+from adminsortable2.ordering import DenseOrdering, get_order_strategy
+from adminsortable2.paginator import KeysetPaginator
+from adminsortable2.signals import items_shifted
+
 __all__ = ['SortableAdminMixin', 'SortableInlineAdminMixin']
 
+# the request whose changelist is being rendered in this thread or task, only read by the deprecated
+# attributes `enable_sorting`, `order_by` and `_reorder_` of SortableAdminMixin
+_current_request = ContextVar('adminsortable2_request', default=None)
+
+
+def _reset_current_request(token):
+    try:
+        _current_request.reset(token)
+    except ValueError:
+        # the response has been rendered in a copy of the context, as done by the ASGI handler
+        _current_request.set(None)
+
 
 def _parse_ordering_part(part):
     if isinstance(part, str):
@@ -63,6 +91,78 @@ def _get_default_ordering(model, model_admin):
     )
 
 
+def _get_max_order(queryset, field_name):
+    if isinstance(queryset.model._meta.get_field(field_name), models.CharField):
+        # string keys have no natural zero, `None` denotes an empty list
+        return queryset.aggregate(max_order=Max(field_name))['max_order']
+    return queryset.aggregate(
+        max_order=Coalesce(Max(field_name, output_field=models.IntegerField()), 0),
+    )['max_order']
+
+
+def _get_inline_allocation_key(model, order_field, parent_opts, parent_pk):
+    return f'{model._meta.label_lower}.{order_field}:{parent_opts.label_lower}.{parent_pk}'
+
+
+def _get_order_cache(shared=True):
+    """
+    Returns the cache named by setting ``ADMINSORTABLE2_CACHE``, which keeps the versions of the
+    sorted lists and the boundaries of their pages, or None if that cache is local to each process.
+    Other processes then would neither notice that a list has changed, nor share its boundaries.
+    With ``shared`` set to False, a process-local cache is returned as well.
+    """
+    cache = caches[getattr(settings, 'ADMINSORTABLE2_CACHE', DEFAULT_CACHE_ALIAS)]
+    if shared and isinstance(cache, (LocMemCache, DummyCache)):
+        return None
+    return cache
+
+
+def _get_order_version_key(model, order_field):
+    # proxy models share the rows, and hence the version, of their concrete model
+    return f'adminsortable2:version:{model._meta.concrete_model._meta.label_lower}.{order_field}'
+
+
+def _bump_order_version(model, order_field):
+    cache = _get_order_cache()
+    if cache is None:
+        return None
+    key = _get_order_version_key(model, order_field)
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # the key has been evicted in the meantime
+        cache.set(key, 1, timeout=None)
+        return 1
+
+
+def _is_reorder_column(field_name):
+    return getattr(field_name, '__name__', field_name) == '_reorder_'
+
+
+def _longest_increasing_subsequence(values):
+    """
+    Return the indices of a longest strictly increasing subsequence of ``values``.
+    """
+    tails, tail_indices, predecessors = [], [], [None] * len(values)
+    for index, value in enumerate(values):
+        position = bisect_left(tails, value)
+        if position > 0:
+            predecessors[index] = tail_indices[position - 1]
+        if position == len(tails):
+            tails.append(value)
+            tail_indices.append(index)
+        else:
+            tails[position] = value
+            tail_indices[position] = index
+    indices = set()
+    index = tail_indices[-1] if tail_indices else None
+    while index is not None:
+        indices.add(index)
+        index = predecessors[index]
+    return indices
+
+
 class MovePageActionForm(admin.helpers.ActionForm):
     step = IntegerField(
         required=False,
@@ -75,6 +175,12 @@ class MovePageActionForm(admin.helpers.ActionForm):
         widget=widgets.NumberInput(attrs={'id': 'changelist-form-page'}),
         label=False
     )
+    position = IntegerField(
+        required=False,
+        min_value=1,
+        widget=widgets.NumberInput(attrs={'id': 'changelist-form-position'}),
+        label=False
+    )
 
 
 class SortableAdminBase:
@@ -97,6 +203,9 @@ class SortableAdminBase:
             formset_params.update(
                 default_order_direction=inline.default_order_direction,
                 default_order_field=inline.default_order_field,
+                order_strategy=getattr(inline, 'order_strategy', None),
+                order_allocator=getattr(inline, 'order_allocator', None),
+                bulk_create_new_items=getattr(inline, 'bulk_create_new_items', False),
             )
         return formset_params
 
@@ -108,6 +217,8 @@ class SortableAdminBase:
                 classes.append('sortable')
                 if inline_admin_formset.formset.default_order_direction == '-':
                     classes.append('reversed')
+                if not inline_admin_formset.formset.order_strategy.numeric:
+                    classes.append('lexicographic')
                 inline_admin_formset.classes = ' '.join(classes)
         return inline_admin_formsets
 
@@ -115,6 +226,17 @@ class SortableAdminBase:
 class SortableAdminMixin(SortableAdminBase):
     BACK, FORWARD, FIRST, LAST, EXACT = range(5)
     action_form = MovePageActionForm
+    order_strategy = None
+    order_allocator = None
+    rebalance_window = 8
+    send_move_signals = True
+    update_delay = 250
+    update_sequence_timeout = 3600
+    order_update_batch_size = None
+    keyset_pagination = False
+    page_index_timeout = 300
+    infinite_scroll = False
+    infinite_scroll_window = 200
 
     @property
     def change_list_template(self):
@@ -129,29 +251,41 @@ class SortableAdminMixin(SortableAdminBase):
 
     def __init__(self, model, admin_site):
         self.default_order_direction, self.default_order_field = _get_default_ordering(model, self)
+        if self.order_strategy is None:
+            self.order_strategy = get_order_strategy(model, self.default_order_field)
+        if self.order_allocator is None:
+            self.order_allocator = MaxOrderAllocator()
         super().__init__(model, admin_site)
-        self.enable_sorting = False
-        self.order_by = None
-        self._add_reorder_method()
 
     def get_list_display(self, request):
         list_display = list(super().get_list_display(request))
-        try:
-            index = list_display.index(self.default_order_field)
-        except ValueError:
-            list_display.insert(0, '_reorder_')
+        if '_reorder_' in list_display:
+            warnings.warn(
+                "Placing the drag handles with '_reorder_' in `list_display` is deprecated, "
+                "use the name of the ordering field instead.",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+            index = list_display.index('_reorder_')
+        else:
+            try:
+                index = list_display.index(self.default_order_field)
+            except ValueError:
+                index = None
+        if index is None:
+            list_display.insert(0, self._get_reorder_column(request))
         else:
-            list_display[index] = '_reorder_'
+            list_display[index] = self._get_reorder_column(request)
         if len(list_display) == 1:
             list_display.append('__str__')
         return list_display
 
     def get_list_display_links(self, request, list_display):
-        list_display_links = list(super().get_list_display_links(request, list_display))
-        if '_reorder_' in list_display_links:
-            list_display_links.remove('_reorder_')
+        list_display_links = [
+            ld for ld in super().get_list_display_links(request, list_display) if not _is_reorder_column(ld)
+        ]
         if len(list_display_links) == 0:
-            list_display_links = [ld for ld in list_display if ld != '_reorder_'][:1]
+            list_display_links = [ld for ld in list_display if not _is_reorder_column(ld)][:1]
         return list_display_links
 
     def get_fields(self, request, obj=None):
@@ -163,6 +297,12 @@ class SortableAdminMixin(SortableAdminBase):
     def _get_update_url_name(self):
         return f'{self.model._meta.app_label}_{self.model._meta.model_name}_sortable_update'
 
+    def _get_move_url_name(self):
+        return f'{self.model._meta.app_label}_{self.model._meta.model_name}_sortable_move'
+
+    def _get_rows_url_name(self):
+        return f'{self.model._meta.app_label}_{self.model._meta.model_name}_sortable_rows'
+
     def get_urls(self):
         my_urls = [
             path(
@@ -170,17 +310,34 @@ class SortableAdminMixin(SortableAdminBase):
                 self.admin_site.admin_view(self.update_order),
                 name=self._get_update_url_name()
             ),
+            path(
+                'adminsortable2_move/',
+                self.admin_site.admin_view(self.move_to_position_view),
+                name=self._get_move_url_name()
+            ),
         ]
+        if self.infinite_scroll:
+            my_urls.append(path(
+                'adminsortable2_rows/',
+                self.admin_site.admin_view(self.changelist_rows_view),
+                name=self._get_rows_url_name()
+            ))
         return my_urls + super().get_urls()
 
     def get_actions(self, request):
         actions = super().get_actions(request)
-        qs = self.get_queryset(request)
-        paginator = self.get_paginator(request, qs, self.list_per_page)
-        if (
-            self.has_change_permission(request) and
-            paginator.num_pages > 1 and 'all' not in request.GET and self.enable_sorting
-        ):
+        if not self.has_change_permission(request) or 'all' in request.GET:
+            return actions
+        cl = getattr(request, '_sortable_changelist', None)
+        if cl is None:
+            # the changelist is being built and just wants to know whether to render action checkboxes
+            for fname in ['move_to_first_page', 'move_to_back_page', 'move_to_forward_page',
+                          'move_to_last_page', 'move_to_exact_page', 'move_to_position']:
+                actions.update({fname: self.get_action(fname)})
+            return actions
+        # reuse the paginator of the changelist, rather than counting the rows again
+        paginator = cl.paginator
+        if paginator.num_pages > 1 and self._get_sortable_order_by(request):
             # add actions for moving items to other pages
             move_actions = []
             cur_page = int(request.GET.get('p', 1))
@@ -196,36 +353,88 @@ class SortableAdminMixin(SortableAdminBase):
                 move_actions.append('move_to_exact_page')
             for fname in move_actions:
                 actions.update({fname: self.get_action(fname)})
+        if self._get_sortable_order_by(request):
+            actions.update({'move_to_position': self.get_action('move_to_position')})
         return actions
 
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        if self.keyset_pagination:
+            cache = _get_order_cache()
+            return KeysetPaginator(
+                queryset, per_page, orphans, allow_empty_first_page, order_field=self.default_order_field,
+                cache=cache, cache_timeout=self.page_index_timeout,
+                cache_key=self._get_page_index_key(request, queryset, per_page, orphans) if cache else None,
+            )
+        return super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
+
+    def _get_page_index_key(self, request, queryset, per_page, orphans):
+        """
+        Returns the cache key of the page boundaries of this queryset, or None if it can not be
+        cached. The key contains the version of the list, so that moving, adding or deleting items
+        invalidates all cached page boundaries.
+        """
+        if not hasattr(queryset, 'query'):
+            return None
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return None
+        digest = hashlib.md5(f'{sql}:{params}:{per_page}:{orphans}'.encode(), usedforsecurity=False).hexdigest()
+        version = self.get_order_version(request)
+        label = self.model._meta.concrete_model._meta.label_lower
+        return f'adminsortable2:pages:{label}.{self.default_order_field}:{version}:{digest}'
+
+    def get_changelist(self, request, **kwargs):
+        ChangeList = super().get_changelist(request, **kwargs)
+        if not getattr(request, '_sortable_rows_only', False):
+            return ChangeList
+
+        class RowsChangeList(ChangeList):
+            def get_results(self, request):
+                # the rows are selected by `changelist_rows_view`, hence they are neither counted nor paginated
+                self.result_list = []
+                self.result_count = self.full_result_count = None
+                self.paginator = None
+                self.can_show_all = self.multi_page = self.show_full_result_count = False
+
+        return RowsChangeList
+
     def get_changelist_instance(self, request):
         cl = super().get_changelist_instance(request)
+        request._sortable_changelist = cl
         qs = self.get_queryset(request)
         ordering = cl.get_ordering(request, qs)
         assert len(ordering) > 0 # `ChangeList.get_ordering` always returns deterministic ordering.
         order_direction, order_field = _parse_ordering_part(ordering[0])
+        # the sorting state belongs to this request, since the admin instance is shared by all of them
         if order_field == self.default_order_field:
-            self.enable_sorting = True
-            self.order_by = f'{order_direction}{order_field}'
+            cl.sortable_order_by = f'{order_direction}{order_field}'
         else:
-            self.enable_sorting = False
+            cl.sortable_order_by = None
         return cl
 
-    def _add_reorder_method(self):
+    def _get_sortable_order_by(self, request):
         """
-        Adds a bound method, named '_reorder_' to the current instance of
-        this class, with attributes allow_tags, short_description and
-        admin_order_field.
-        This can only be done using a function, since it is not possible
-        to add dynamic attributes to bound methods.
+        Returns the ordering of the changelist built for this request, if its items can be
+        dragged, otherwise None.
         """
-        def func(this, item):
-            if this.enable_sorting:
-                order = getattr(item, this.default_order_field)
-                html = f'<div class="drag handle" pk="{item.pk}" order="{order}">&nbsp;</div>'
-            else:
-                html = '<div class="drag">&nbsp;</div>'
-            return mark_safe(html)
+        cl = getattr(request, '_sortable_changelist', None)
+        return getattr(cl, 'sortable_order_by', None)
+
+    def _get_reorder_column(self, request):
+        """
+        Returns a function, named '_reorder_', rendering the drag handle of each item together with
+        buttons moving it to the top or bottom, with attributes short_description and admin_order_field.
+        It is created once for each request, because whether items can be dragged depends on the
+        ordering chosen by that request.
+        """
+        if hasattr(request, '_sortable_reorder_column'):
+            return request._sortable_reorder_column
+
+        def func(item):
+            return self._render_reorder_column(item, self._get_sortable_order_by(request))
+
+        func.__name__ = '_reorder_'
 
         # if the field used for ordering has a verbose name use it, otherwise default to "Sort"
         for order_field in self.model._meta.fields:
@@ -237,42 +446,454 @@ class SortableAdminMixin(SortableAdminBase):
         else:
             setattr(func, 'short_description', _("Sort"))
         setattr(func, 'admin_order_field', self.default_order_field)
-        setattr(self, '_reorder_', MethodType(func, self))
+        request._sortable_reorder_column = func
+        return func
+
+    def _render_reorder_column(self, item, order_by):
+        if order_by:
+            order = getattr(item, self.default_order_field)
+            # "top" and "bottom" refer to the default ordering, which may be shown reversed
+            positions = ['top', 'bottom']
+            if order_by.startswith('-') != (self.default_order_direction == '-'):
+                positions.reverse()
+            html = format_html(
+                '<div class="drag handle" pk="{}" order="{}">&nbsp;</div><span class="sort">'
+                '<i class="move-begin" position="{}" title="{}"></i>'
+                '<i class="move-end" position="{}" title="{}"></i></span>',
+                item.pk, order, positions[0], _("Move to top"), positions[1], _("Move to bottom"),
+            )
+        else:
+            html = '<div class="drag">&nbsp;</div>'
+        return mark_safe(html)
+
+    def _get_current_changelist(self):
+        cl = getattr(_current_request.get(), '_sortable_changelist', None)
+        return cl if getattr(cl, 'model_admin', None) is self else None
+
+    def _warn_deprecated(self, name, replacement):
+        warnings.warn(
+            f"`{type(self).__name__}.{name}` is deprecated, since the sorting state belongs to each request, "
+            f"use {replacement} instead.",
+            DeprecationWarning,
+            stacklevel=3,
+        )
+
+    @property
+    def enable_sorting(self):
+        """
+        Deprecated, whether the items of the changelist being rendered in this thread can be dragged.
+        """
+        self._warn_deprecated('enable_sorting', '`_get_sortable_order_by(request)`')
+        return getattr(self._get_current_changelist(), 'sortable_order_by', None) is not None
+
+    @enable_sorting.setter
+    def enable_sorting(self, value):
+        self._warn_deprecated('enable_sorting', '`_get_sortable_order_by(request)`')
+        cl = self._get_current_changelist()
+        if cl is None:
+            return
+        if not value:
+            cl.sortable_order_by = None
+        elif cl.sortable_order_by is None:
+            cl.sortable_order_by = f'{self.default_order_direction}{self.default_order_field}'
+
+    @property
+    def order_by(self):
+        """
+        Deprecated, the ordering of the changelist being rendered in this thread, if its items can be dragged.
+        """
+        self._warn_deprecated('order_by', '`_get_sortable_order_by(request)`')
+        return getattr(self._get_current_changelist(), 'sortable_order_by', None)
+
+    @order_by.setter
+    def order_by(self, value):
+        self._warn_deprecated('order_by', '`_get_sortable_order_by(request)`')
+        cl = self._get_current_changelist()
+        if cl is not None:
+            cl.sortable_order_by = value
+
+    def _reorder_(self, item):
+        """
+        Deprecated, renders the drag handle of an item of the changelist being rendered in this thread.
+        """
+        self._warn_deprecated('_reorder_', 'the column returned by `get_list_display(request)`')
+        order_by = getattr(self._get_current_changelist(), 'sortable_order_by', None)
+        return self._render_reorder_column(item, order_by)
 
     def update_order(self, request):
         if request.method != 'POST':
             return HttpResponseNotAllowed(f"Method {request.method} not allowed")
         if not self.has_change_permission(request):
             return HttpResponseForbidden('Missing permissions to perform this request')
+        extra_model_filters = self.get_extra_model_filters(request)
+        with measure('update_order', self.model, extra_model_filters, len(request.body)) as measurement:
+            try:
+                payload = json.loads(request.body)
+                if self._is_stale_update(payload):
+                    return HttpResponse(f"Ignored stale update {payload['sequence']}", status=409)
+                version = self.get_order_version(request)
+                if 'moves' in payload:
+                    updated_orders = self._apply_moves(request, payload['moves'], extra_model_filters)
+                else:
+                    updated_orders = self._update_order(payload.get('updatedItems'), extra_model_filters)
+                    self._advance_order_allocator(request, updated_orders)
+                response = self._get_order_response(request, updated_orders, payload, version)
+                if settings.DEBUG:
+                    response['X-Query-Count'] = measurement.queries
+                return response
+            except IntegrityError as exc:
+                measurement.failed = True
+                msg = (
+                    f"{exc}. Run 'manage.py checkorder --repair "
+                    f"{self.model._meta.app_label}.{self.model._meta.model_name}' to fix the ordering."
+                )
+                return HttpResponseBadRequest(msg)
+            except Exception as exc:
+                measurement.failed = True
+                return HttpResponseBadRequest(f"Invalid POST request: {exc}")
+
+    def _get_order_response(self, request, updated_orders, payload, version):
+        if version is None:
+            # without a shared cache, changes made by other processes can not be noticed
+            outdated, new_version = False, None
+        else:
+            outdated = payload.get('version', version) != version
+            new_version = self.get_order_version(request) + self._get_pending_version_bumps()
+        return JsonResponse({
+            'updated': len(updated_orders),
+            'orders': {str(pk): order for pk, order in updated_orders.items()},
+            'version': new_version,
+            # true if somebody else changed the list since the client received its version
+            'outdated': outdated,
+        })
+
+    def move_to_position_view(self, request):
+        """
+        Move a single item to an absolute position of the sorted list, posted as
+        ``{"pk": 17, "position": 250}``, where position is 1-based, or one of "top" and "bottom".
+        """
+        if request.method != 'POST':
+            return HttpResponseNotAllowed(f"Method {request.method} not allowed")
+        if not self.has_change_permission(request):
+            return HttpResponseForbidden('Missing permissions to perform this request')
+        extra_model_filters = self.get_extra_model_filters(request)
+        with measure('move_to_position', self.model, extra_model_filters, len(request.body)) as measurement:
+            try:
+                payload = json.loads(request.body)
+                version = self.get_order_version(request)
+                position = payload['position']
+                if position == 'top':
+                    index = 0
+                elif position == 'bottom':
+                    index = None
+                elif isinstance(position, int) and position > 0:
+                    index = position - 1
+                else:
+                    raise ValueError(f"Invalid position {position!r}")
+                updated_orders = self._move_to_position(request, payload['pk'], index)
+                return self._get_order_response(request, updated_orders, payload, version)
+            except IntegrityError as exc:
+                measurement.failed = True
+                msg = (
+                    f"{exc}. Run 'manage.py checkorder --repair "
+                    f"{self.model._meta.app_label}.{self.model._meta.model_name}' to fix the ordering."
+                )
+                return HttpResponseBadRequest(msg)
+            except Exception as exc:
+                measurement.failed = True
+                return HttpResponseBadRequest(f"Invalid POST request: {exc}")
+
+    def changelist_rows_view(self, request):
+        """
+        Returns the rendered rows of the changelist following the item whose ordering field has the
+        value of parameter ``after``, or preceding the one given by ``before``, so that the browser can
+        load them while scrolling. Parameter ``last_pk`` is the primary key of that item, it tells apart
+        items sharing the same value. All other parameters filter the list as they do for the changelist.
+        """
+        if request.method != 'GET':
+            return HttpResponseNotAllowed(f"Method {request.method} not allowed")
+        if not self.has_view_or_change_permission(request):
+            return HttpResponseForbidden('Missing permissions to perform this request')
+        params = request.GET.copy()
+        after, before = params.pop('after', [None])[-1], params.pop('before', [None])[-1]
+        last_pk = params.pop('last_pk', [None])[-1]
         try:
-            extra_model_filters = self.get_extra_model_filters(request)
-            num_updated = self._update_order(json.loads(request.body).get('updatedItems'), extra_model_filters)
-            return HttpResponse(f"Updated {num_updated} items")
-        except IntegrityError as exc:
-            msg = (
-                f"{exc}. Run 'manage.py reorder "
-                f"{self.model._meta.app_label}.{self.model._meta.model_name}' to fix the ordering."
-            )
-            return HttpResponseBadRequest(msg)
-        except Exception as exc:
-            return HttpResponseBadRequest(f"Invalid POST request: {exc}")
+            limit = min(int(params.pop('limit', [self.list_per_page])[-1]), self.list_max_show_all)
+            if (after is None) == (before is None) or limit < 1:
+                raise ValueError("Expected either 'after' or 'before' and a positive 'limit'")
+            request.GET = params
+            # only filter and order the queryset of the changelist
+            request._sortable_rows_only = True
+            cl = self.get_changelist_instance(request)
+            order_by = self._get_sortable_order_by(request)
+            if not order_by:
+                raise ValueError(f"List is not sorted by {self.default_order_field}")
+            value = self.model._meta.get_field(self.default_order_field).to_python(after or before)
+            if value is None:
+                raise ValueError(f"Missing value of {self.default_order_field}")
+            if last_pk is not None:
+                last_pk = self.model._meta.pk.to_python(last_pk)
+        except (ValueError, IncorrectLookupParameters, ValidationError) as exc:
+            return HttpResponseBadRequest(f"Invalid GET request: {exc}")
+
+        # keyed by the value of the ordering field and the primary key, hence the rows do not depend on an
+        # offset and items sharing the same value are neither skipped nor repeated
+        forward = before is None
+        pk_descending = self._get_pk_descending(cl.queryset, order_by)
+        lookup = 'gt' if forward != order_by.startswith('-') else 'lt'
+        condition = Q(**{f'{self.default_order_field}__{lookup}': value})
+        if last_pk is not None:
+            pk_lookup = 'gt' if forward != pk_descending else 'lt'
+            condition |= Q(**{self.default_order_field: value, f'pk__{pk_lookup}': last_pk})
+        queryset = cl.queryset.filter(condition).order_by(order_by, '-pk' if pk_descending else 'pk')
+        if not forward:
+            queryset = queryset.reverse()
+        objects = list(queryset[:limit + 1])
+        more = len(objects) > limit
+        objects = objects[:limit]
+        if not forward:
+            objects.reverse()
+        cl.result_list = objects
+        return JsonResponse({
+            'rows': [{
+                'pk': str(obj.pk),
+                'order': getattr(obj, self.default_order_field),
+                'html': format_html('<tr>{}</tr>', mark_safe(''.join(items_for_result(cl, obj, None)))),
+            } for obj in objects],
+            'more': more,
+        })
+
+    def _get_pk_descending(self, queryset, order_by):
+        """
+        Returns whether the changelist breaks ties of the ordering field by descending primary keys.
+        Without a primary key in its ordering, ties are broken in the direction of the ordering field.
+        """
+        pk_names = {'pk', self.model._meta.pk.name, self.model._meta.pk.attname}
+        for part in queryset.query.order_by:
+            prefix, field_name = _parse_ordering_part(part)
+            if field_name in pk_names:
+                return prefix == '-'
+        return order_by.startswith('-')
+
+    def _move_to_position(self, request, pk, index):
+        """
+        Move the item with primary key ``pk`` to the zero-based ``index`` of the sorted list, or to
+        its end if ``index`` is None or beyond. The position found at that index is sought using the
+        paginator and then the item is moved there by shifting the range in between, so that the
+        number of queries does not depend on the size of the list.
+        """
+        model = self.model
+        rank_field = self.default_order_field
+        extra_model_filters = self.get_extra_model_filters(request)
+        queryset = model.objects.filter(**extra_model_filters)
+        with transaction.atomic():
+            objects = self._get_items_for_update(queryset, [model._meta.pk.to_python(pk)])
+            obj, = objects.values()
+            ordered = queryset.order_by(f'{self.default_order_direction}{rank_field}')
+            target = None
+            if index is not None:
+                paginator = self.get_paginator(request, ordered, self.list_per_page)
+                if isinstance(paginator, KeysetPaginator) and paginator.descending is not None:
+                    target = paginator.get_item_at(index)
+                else:
+                    target = next(iter(ordered.values_list('pk', rank_field)[index:index + 1]), None)
+            if target is None:
+                target = ordered.values_list('pk', rank_field).reverse()[0]
+            updated_orders = self._move_item(getattr(obj, rank_field), target[1], extra_model_filters) or {}
+            self._advance_order_allocator(request, updated_orders)
+            return updated_orders
+
+    def _is_stale_update(self, payload):
+        """
+        The client numbers its batches of dragged items. Return True if this batch, or one with a
+        higher sequence number of the same client, already has been received. Its moves are relative
+        to the neighbours the items had when it was sent, hence applying it after a newer batch, or
+        twice, would move the items again.
+        """
+        if 'sequence' not in payload or 'client' not in payload:
+            return False
+        sequence = int(payload['sequence'])
+        # a cache local to each process may miss a stale batch, but never rejects a current one
+        cache = _get_order_cache(shared=False)
+        label = self.model._meta.concrete_model._meta.label_lower
+        key = f'adminsortable2:sequence:{label}:{payload["client"]}'
+        if cache.add(key, sequence, self.update_sequence_timeout):
+            return False
+        last_sequence = cache.get(key)
+        if last_sequence is not None and sequence <= last_sequence:
+            return True
+        cache.set(key, sequence, self.update_sequence_timeout)
+        return False
+
+    def _get_items_for_update(self, queryset, pks):
+        """
+        Fetch and lock all items with the given primary keys using one query. Raise a
+        ``ValueError`` unless each of them exists.
+        """
+        objects = queryset.select_for_update().only(self.default_order_field).in_bulk(pks)
+        count_rows(locked=len(objects))
+        if len(objects) != len(pks):
+            missing = ', '.join(str(pk) for pk in pks if pk not in objects)
+            raise ValueError(f"Unknown items {missing}")
+        return objects
 
     def _update_order(self, updated_items, extra_model_filters):
-        queryset = self.model.objects.filter(**extra_model_filters)
-        updated_objects = []
-        for item in updated_items:
-            obj = queryset.get(pk=item[0])
-            setattr(obj, self.default_order_field, item[1])
-            updated_objects.append(obj)
-        return self.model.objects.bulk_update(updated_objects, [self.default_order_field])
+        with measure('update_items', self.model, extra_model_filters):
+            if self.order_strategy.sparse:
+                return self._update_sparse_order(updated_items, extra_model_filters)
+            model = self.model
+            rank_field = self.default_order_field
+            to_python = model._meta.get_field(rank_field).to_python
+            updated_orders = {model._meta.pk.to_python(pk): to_python(order) for pk, order in updated_items}
+            if len(updated_orders) != len(updated_items):
+                raise ValueError("Duplicate items")
+            with transaction.atomic():
+                queryset = model.objects.filter(**extra_model_filters)
+                objects = self._get_items_for_update(queryset, list(updated_orders))
+                # the items may only exchange their positions, otherwise positions would be duplicated or lost
+                current_orders = sorted(getattr(obj, rank_field) for obj in objects.values())
+                if sorted(updated_orders.values()) != current_orders:
+                    raise ValueError("Posted positions differ from the current positions of these items")
+                for pk, obj in objects.items():
+                    setattr(obj, rank_field, updated_orders[pk])
+                model.objects.bulk_update(objects.values(), [rank_field], batch_size=self.order_update_batch_size)
+                count_rows(shifted=len(objects))
+                self._order_changed()
+            return updated_orders
+
+    def _update_sparse_order(self, updated_items, extra_model_filters):
+        """
+        With sparse ordering, the posted positions only describe the new sequence of the dragged
+        span. Items keeping their relative order remain untouched, all others are placed between
+        their new neighbours. If there is no room left, the positions of the span are reassigned.
+        """
+        model = self.model
+        rank_field = self.default_order_field
+        pks = [model._meta.pk.to_python(pk) for pk, _ in sorted(updated_items, key=lambda item: item[1])]
+        if len(set(pks)) != len(pks):
+            raise ValueError("Duplicate items")
+        queryset = model.objects.filter(**extra_model_filters)
+        with transaction.atomic():
+            objects = self._get_items_for_update(queryset, pks)
+            items = [objects[pk] for pk in pks]
+            values = [getattr(item, rank_field) for item in items]
+            if not items:
+                return {}
+            others = queryset.exclude(pk__in=pks)
+            lower_bound = others.filter(**{f'{rank_field}__lt': min(values)}).aggregate(
+                max_order=Max(rank_field)
+            )['max_order']
+            upper_bound = others.filter(**{f'{rank_field}__gt': max(values)}).aggregate(
+                min_order=Min(rank_field)
+            )['min_order']
+            keep = _longest_increasing_subsequence(values)
+            updated_objects, moved, lower = [], [], lower_bound
+            for index, item in enumerate(items + [None]):
+                if index < len(items) and index not in keep:
+                    moved.append(item)
+                    continue
+                upper = values[index] if index < len(items) else upper_bound
+                if moved:
+                    new_values = self.order_strategy.spread(lower, upper, len(moved))
+                    if new_values is None:
+                        break
+                    for obj, value in zip(moved, new_values):
+                        setattr(obj, rank_field, value)
+                    updated_objects.extend(moved)
+                    moved = []
+                lower = upper
+            else:
+                model.objects.bulk_update(updated_objects, [rank_field], batch_size=self.order_update_batch_size)
+                count_rows(shifted=len(updated_objects))
+                if updated_objects:
+                    self._order_changed()
+                return {obj.pk: getattr(obj, rank_field) for obj in updated_objects}
+
+            # no room left between the neighbours, hence reuse the positions of the dragged span
+            updated_objects = []
+            for item, value in zip(items, sorted(values)):
+                if getattr(item, rank_field) != value:
+                    setattr(item, rank_field, value)
+                    updated_objects.append(item)
+            model.objects.bulk_update(updated_objects, [rank_field], batch_size=self.order_update_batch_size)
+            count_rows(shifted=len(updated_objects))
+            self._order_changed()
+            return {obj.pk: getattr(obj, rank_field) for obj in updated_objects}
+
+    def _apply_moves(self, request, moves, extra_model_filters):
+        """
+        Apply a list of relative moves, such as ``{"items": [3, 7], "before": 5}``, in their given
+        sequence. Here ``before`` and ``after`` refer to the ascending values of the ordering
+        field, rather than to the sequence shown in the list. Since the moves are resolved against
+        the current positions, the client only posts the dragged items and their new neighbour.
+        Return a dict mapping the primary keys of all updated items onto their new positions.
+        """
+        updated_orders = {}
+        with transaction.atomic():
+            for move in moves:
+                updated_orders.update(self._apply_move(request, move, extra_model_filters))
+            self._advance_order_allocator(request, updated_orders)
+        return updated_orders
+
+    def _apply_move(self, request, move, extra_model_filters):
+        model = self.model
+        rank_field = self.default_order_field
+        pks = [model._meta.pk.to_python(pk) for pk in move['items']]
+        if 'before' in move:
+            anchor_pk, after = model._meta.pk.to_python(move['before']), False
+        else:
+            anchor_pk, after = model._meta.pk.to_python(move['after']), True
+        if not pks or len(set(pks)) != len(pks):
+            raise ValueError("Duplicate items")
+        if anchor_pk in pks:
+            raise ValueError(f"Item {anchor_pk} can not be moved next to itself")
+        queryset = model.objects.filter(**extra_model_filters)
+        objects = self._get_items_for_update(queryset, pks + [anchor_pk])
+        anchor_order = getattr(objects[anchor_pk], rank_field)
+        others = queryset.exclude(pk__in=pks)
+
+        if len(pks) > 1:
+            position = others.filter(**{f'{rank_field}__{"lte" if after else "lt"}': anchor_order}).count()
+            return self._move_items_to_position(request, queryset.filter(pk__in=pks), position, rank_field)
+
+        startorder = getattr(objects[pks[0]], rank_field)
+        if after and startorder > anchor_order:
+            # moving upwards, the item takes the position of the anchor's successor
+            endorder = others.filter(**{f'{rank_field}__gt': anchor_order}).aggregate(
+                min_order=Min(rank_field)
+            )['min_order']
+            if endorder is None or endorder > startorder:
+                return {}
+        elif not after and startorder < anchor_order:
+            # moving downwards, the item takes the position of the anchor's predecessor
+            endorder = others.filter(**{f'{rank_field}__lt': anchor_order}).aggregate(
+                max_order=Max(rank_field)
+            )['max_order']
+            if endorder is None or endorder < startorder:
+                return {}
+        else:
+            endorder = anchor_order
+        return self._move_item(startorder, endorder, extra_model_filters) or {}
 
     def save_model(self, request, obj, form, change):
         if not change:
-            setattr(
-                obj, self.default_order_field,
-                self.get_max_order(request, obj) + 1
+            order, = self.order_allocator.allocate(
+                self.order_strategy,
+                lambda: self.get_max_order(request, obj),
+                key=self.get_order_allocation_key(request),
             )
+            setattr(obj, self.default_order_field, order)
         super().save_model(request, obj, form, change)
+        # added or edited items may change the boundaries of pages, even if filtered
+        self._order_changed()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self._order_changed()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        self._order_changed()
 
     def move_to_exact_page(self, request, queryset):
         self._bulk_move(request, queryset, self.EXACT)
@@ -294,75 +915,220 @@ class SortableAdminMixin(SortableAdminBase):
         self._bulk_move(request, queryset, self.LAST)
     move_to_last_page.short_description = _('Move selected to last page')
 
-    def _move_item(self, startorder, endorder, extra_model_filters):
+    def move_to_position(self, request, queryset):
+        order_by = self._get_sortable_order_by(request)
+        try:
+            position = int(request.POST.get('position'))
+        except (ValueError, TypeError):
+            return
+        if not order_by or position < 1:
+            return
+        objects = self.model.objects.order_by(order_by)
+        paginator = self.get_paginator(request, objects, self.list_per_page)
+        self._move_items_to_position(request, queryset, position - 1, order_by, paginator, return_orders=False)
+    move_to_position.short_description = _('Move selected to position')
+
+    def _get_item_for_update(self, queryset, order):
         model = self.model
         rank_field = self.default_order_field
+        try:
+            obj = queryset.select_for_update().get(**{rank_field: order})
+        except model.MultipleObjectsReturned:
+
+            # noinspection PyProtectedMember
+            raise model.MultipleObjectsReturned(
+                f"Detected non-unique values in field '{rank_field}' used for sorting this model.\n"
+                f"Consider to run \n    python manage.py checkorder --repair {model._meta.label}\n"
+                "to adjust this inconsistency."
+            )
+        count_rows(locked=1)
+        return obj
 
-        if endorder < startorder:  # Drag up
-            move_filter = {
-                f'{rank_field}__gte': endorder,
-                f'{rank_field}__lte': startorder - 1,
-            }
-            move_delta = +1
-            order_by = f'-{rank_field}'
-        elif endorder > startorder:  # Drag down
-            move_filter = {
-                f'{rank_field}__gte': startorder + 1,
-                f'{rank_field}__lte': endorder,
-            }
-            move_delta = -1
-            order_by = rank_field
-        else:
-            return model.objects.none()
-
-        obj_filters = {rank_field: startorder}
-        if extra_model_filters is not None:
-            obj_filters.update(extra_model_filters)
-            move_filter.update(extra_model_filters)
+    def _move_item(self, startorder, endorder, extra_model_filters, return_orders=True):
+        """
+        Move the item at position ``startorder`` to position ``endorder`` and shift all items in
+        between by one. Return a dict mapping the primary keys of all moved items onto their new
+        positions. If ``send_move_signals`` is disabled, the shifted items are not loaded, but
+        updated by a single statement. Then ``return_orders=False`` avoids fetching their keys.
+        """
+        with measure('move_item', self.model, extra_model_filters):
+            if self.order_strategy.sparse:
+                return self._move_sparse_item(startorder, endorder, extra_model_filters)
+
+            model = self.model
+            rank_field = self.default_order_field
+
+            if endorder < startorder:  # Drag up
+                move_filter = {
+                    f'{rank_field}__gte': endorder,
+                    f'{rank_field}__lte': startorder - 1,
+                }
+                move_delta = +1
+                order_by = f'-{rank_field}'
+            elif endorder > startorder:  # Drag down
+                move_filter = {
+                    f'{rank_field}__gte': startorder + 1,
+                    f'{rank_field}__lte': endorder,
+                }
+                move_delta = -1
+                order_by = rank_field
+            else:
+                return model.objects.none()
+
+            if extra_model_filters is not None:
+                move_filter.update(extra_model_filters)
+
+            with transaction.atomic():
+                obj = self._get_item_for_update(model.objects.filter(**(extra_model_filters or {})), startorder)
+                move_qs = model.objects.select_for_update().filter(**move_filter).order_by(order_by)
+                if self.send_move_signals:
+                    move_objs = list(move_qs)
+                    for instance in move_objs:
+                        setattr(
+                            instance, rank_field,
+                            getattr(instance, rank_field) + move_delta
+                        )
+                        # Do not run `instance.save()`, because it will be updated
+                        # later in bulk by `move_qs.update`.
+                        pre_save.send(
+                            model,
+                            instance=instance,
+                            update_fields=[rank_field],
+                            raw=False,
+                            using=router.db_for_write(model, instance=instance),
+                        )
+                    move_qs.update(**{rank_field: F(rank_field) + move_delta})
+                    for instance in move_objs:
+                        post_save.send(
+                            model,
+                            instance=instance,
+                            update_fields=[rank_field],
+                            raw=False,
+                            using=router.db_for_write(model, instance=instance),
+                            created=False,
+                        )
+                    updated_orders = {instance.pk: getattr(instance, rank_field) for instance in move_objs}
+                    count_rows(shifted=len(move_objs), locked=len(move_objs))
+                else:
+                    updated_orders = {}
+                    if return_orders:
+                        updated_orders = {
+                            pk: order + move_delta for pk, order in move_qs.values_list('pk', rank_field)
+                        }
+                    count = model.objects.filter(**move_filter).update(
+                        **{rank_field: F(rank_field) + move_delta}
+                    )
+                    count_rows(shifted=count, locked=count)
+                    items_shifted.send(
+                        model,
+                        order_field=rank_field,
+                        start=move_filter[f'{rank_field}__gte'],
+                        end=move_filter[f'{rank_field}__lte'],
+                        delta=move_delta,
+                        count=count,
+                        extra_filters=extra_model_filters or {},
+                        using=router.db_for_write(model),
+                    )
+
+                setattr(obj, rank_field, endorder)
+                obj.save(update_fields=[rank_field])
+                updated_orders[obj.pk] = endorder
+                count_rows(shifted=1)
+                self._order_changed()
+
+            return updated_orders
+
+    def _move_sparse_item(self, startorder, endorder, extra_model_filters):
+        """
+        Move the item at position ``startorder`` next to the item at position ``endorder`` by
+        assigning the midpoint of its new neighbours. This only updates a single row, unless
+        there is no room left between these neighbours.
+        """
+        rank_field = self.default_order_field
+        if endorder == startorder:
+            return self.model.objects.none()
 
+        queryset = self.model.objects.filter(**(extra_model_filters or {}))
         with transaction.atomic():
-            try:
-                obj = model.objects.select_for_update().get(**obj_filters)
-            except model.MultipleObjectsReturned:
-
-                # noinspection PyProtectedMember
-                raise model.MultipleObjectsReturned(
-                    f"Detected non-unique values in field '{rank_field}' used for sorting this model.\n"
-                    f"Consider to run \n    python manage.py reorder {model._meta.label}\n"
-                    "to adjust this inconsistency."
-                )
-
-            move_qs = model.objects.select_for_update().filter(**move_filter).order_by(order_by)
-            move_objs = list(move_qs)
-            for instance in move_objs:
-                setattr(
-                    instance, rank_field,
-                    getattr(instance, rank_field) + move_delta
-                )
-                # Do not run `instance.save()`, because it will be updated
-                # later in bulk by `move_qs.update`.
-                pre_save.send(
-                    model,
-                    instance=instance,
-                    update_fields=[rank_field],
-                    raw=False,
-                    using=router.db_for_write(model, instance=instance),
-                )
-            move_qs.update(**{rank_field: F(rank_field) + move_delta})
-            for instance in move_objs:
+            obj = self._get_item_for_update(queryset, startorder)
+            others = queryset.exclude(pk=obj.pk)
+            if endorder < startorder:  # Drag up
+                lower = others.filter(**{f'{rank_field}__lt': endorder}).aggregate(
+                    max_order=Max(rank_field)
+                )['max_order']
+                upper = endorder
+            else:  # Drag down
+                lower = endorder
+                upper = others.filter(**{f'{rank_field}__gt': endorder}).aggregate(
+                    min_order=Min(rank_field)
+                )['min_order']
+            return self._place_items(others, [obj], lower, upper)
+
+    def _place_items(self, queryset, objs, lower, upper):
+        """
+        Assign positions strictly between ``lower`` and ``upper`` to ``objs``, keeping their given
+        sequence. Here ``queryset`` contains all other items of the sorted list. If there is no
+        room left, the neighbouring items are renumbered as well, using a window which doubles in
+        size until the positions fit.
+        """
+        rank_field = self.default_order_field
+        items, neighbours = list(objs), []
+        values = self.order_strategy.spread(lower, upper, len(items))
+        window = self.rebalance_window
+        while values is None:
+            below, above = [], []
+            if lower is not None:
+                below = list(queryset.select_for_update().filter(**{f'{rank_field}__lte': lower}).order_by(
+                    f'-{rank_field}'
+                ).only(rank_field)[:window + 1])
+            if upper is not None:
+                above = list(queryset.select_for_update().filter(**{f'{rank_field}__gte': upper}).order_by(
+                    rank_field
+                ).only(rank_field)[:window + 1])
+            lower_bound = getattr(below.pop(), rank_field) if len(below) > window else None
+            upper_bound = getattr(above.pop(), rank_field) if len(above) > window else None
+            neighbours = below[::-1] + above
+            items = below[::-1] + list(objs) + above
+            values = self.order_strategy.spread(lower_bound, upper_bound, len(items))
+            window *= 2
+
+        for item, value in zip(items, values):
+            setattr(item, rank_field, value)
+        # the placed items are written together with the renumbered neighbours, by one statement
+        using = router.db_for_write(self.model)
+        if self.send_move_signals:
+            for obj in objs:
+                pre_save.send(self.model, instance=obj, update_fields=[rank_field], raw=False, using=using)
+        self.model.objects.bulk_update(items, [rank_field], batch_size=self.order_update_batch_size)
+        if self.send_move_signals:
+            for obj in objs:
                 post_save.send(
-                    model,
-                    instance=instance,
-                    update_fields=[rank_field],
-                    raw=False,
-                    using=router.db_for_write(model, instance=instance),
-                    created=False,
+                    self.model, instance=obj, update_fields=[rank_field], raw=False, using=using, created=False,
                 )
+        count_rows(shifted=len(items), locked=len(neighbours))
+        self._order_changed()
+        return {item.pk: getattr(item, rank_field) for item in items}
 
-            setattr(obj, rank_field, endorder)
-            obj.save(update_fields=[rank_field])
-
-        return {instance.pk: getattr(instance, rank_field) for instance in chain(move_objs, [obj])}
+    def _seek_anchor(self, paginator, selected, position):
+        """
+        Returns the primary key and position of the item preceded by ``position`` items which are
+        not selected, using the paginator to seek items by their index in the complete list.
+        """
+        rank_field = self.default_order_field
+        selected_pks = {obj.pk for obj in selected}
+        selected_values = [getattr(obj, rank_field) for obj in selected]
+        index = position
+        while True:
+            item = paginator.get_item_at(index)
+            if item is None:
+                return None
+            if paginator.descending:
+                skipped = sum(1 for value in selected_values if value > item[1])
+            else:
+                skipped = sum(1 for value in selected_values if value < item[1])
+            if item[0] not in selected_pks and index - skipped == position:
+                return item
+            index = max(index + 1, position + skipped)
 
     @staticmethod
     def get_extra_model_filters(request):
@@ -372,86 +1138,312 @@ class SortableAdminMixin(SortableAdminBase):
         return {}
 
     def get_max_order(self, request, obj=None):
-        return self.model.objects.aggregate(
-            max_order=Coalesce(Max(self.default_order_field, output_field=models.IntegerField()), 0),
-        )['max_order']
+        with measure('get_max_order', self.model):
+            return _get_max_order(self.model.objects, self.default_order_field)
 
-    def _bulk_move(self, request, queryset, method):
-        if not self.enable_sorting:
-            return
-        objects = self.model.objects.order_by(self.order_by)
-        paginator = self.paginator(objects, self.list_per_page)
-        current_page_number = int(request.GET.get('p', 1))
+    def get_order_allocation_key(self, request):
+        """
+        Returns the key identifying the list of sortable objects for the order allocator. After
+        renumbering the list, the management commands call it with ``request`` set to None.
+        """
+        return f'{self.model._meta.label_lower}.{self.default_order_field}'
 
-        if method == self.EXACT:
-            try:
-                page_number = int(request.POST.get('page'))
-            except (ValueError, TypeError):
-                page_number = current_page_number
-            target_page_number = page_number
-        elif method == self.BACK:
-            try:
-                step = int(request.POST.get('step'))
-            except (ValueError, TypeError):
-                step = 1
-            target_page_number = current_page_number - step
-        elif method == self.FORWARD:
-            try:
-                step = int(request.POST.get('step'))
-            except (ValueError, TypeError):
-                step = 1
-            target_page_number = current_page_number + step
-        elif method == self.FIRST:
-            target_page_number = 1
-        elif method == self.LAST:
-            target_page_number = paginator.num_pages
-        else:
-            raise Exception('Invalid method')
+    def _advance_order_allocator(self, request, updated_orders):
+        # with sparse ordering, items moved to the end of the list are placed beyond the highest
+        # position, which then must not be handed out to new items
+        if updated_orders and self.order_strategy.numeric:
+            self.order_allocator.advance(self.get_order_allocation_key(request), max(updated_orders.values()))
 
-        if target_page_number == current_page_number:
-            # If you want the selected items to be moved to the start of the current page, then just do not return here
+    def get_order_version(self, request):
+        """
+        Returns a number identifying the state of the sorted list. It is incremented whenever an
+        admin or one of the management commands changes the positions of its items. Returns None
+        if the cache named by setting ``ADMINSORTABLE2_CACHE`` is local to each process.
+        """
+        cache = _get_order_cache()
+        if cache is None:
+            return None
+        return cache.get(_get_order_version_key(self.model, self.default_order_field), 0)
+
+    def _order_changed(self):
+        # bump the version after committing, so that nobody caches page boundaries of uncommitted
+        # positions under the new version
+        def bump_order_version():
+            # no longer pending, even if the callback remains listed, as when captured by tests
+            bump_order_version.order_version_key = None
+            return _bump_order_version(self.model, self.default_order_field)
+
+        if _get_order_cache() is None:
             return
+        bump_order_version.order_version_key = _get_order_version_key(self.model, self.default_order_field)
+        transaction.on_commit(bump_order_version, using=router.db_for_write(self.model))
 
-        try:
-            page = paginator.page(target_page_number)
-        except EmptyPage as ex:
-            self.message_user(request, str(ex), level=messages.ERROR)
-            return
+    def _get_pending_version_bumps(self):
+        """
+        Returns the number of times the version will be incremented when committing the current
+        transaction. A response built inside a transaction, for instance with ``ATOMIC_REQUESTS``,
+        hence can carry the version the list will have afterwards.
+        """
+        key = _get_order_version_key(self.model, self.default_order_field)
+        connection = transaction.get_connection(router.db_for_write(self.model))
+        return sum(
+            1 for _, func, *_ in connection.run_on_commit if getattr(func, 'order_version_key', None) == key
+        )
+
+    def _bulk_move(self, request, queryset, method):
+        with measure('bulk_move', self.model, self.get_extra_model_filters(request)):
+            order_by = self._get_sortable_order_by(request)
+            if not order_by:
+                return
+            objects = self.model.objects.order_by(order_by)
+            paginator = self.get_paginator(request, objects, self.list_per_page)
+            current_page_number = int(request.GET.get('p', 1))
+
+            if method == self.EXACT:
+                try:
+                    page_number = int(request.POST.get('page'))
+                except (ValueError, TypeError):
+                    page_number = current_page_number
+                target_page_number = page_number
+            elif method == self.BACK:
+                try:
+                    step = int(request.POST.get('step'))
+                except (ValueError, TypeError):
+                    step = 1
+                target_page_number = current_page_number - step
+            elif method == self.FORWARD:
+                try:
+                    step = int(request.POST.get('step'))
+                except (ValueError, TypeError):
+                    step = 1
+                target_page_number = current_page_number + step
+            elif method == self.FIRST:
+                target_page_number = 1
+            elif method == self.LAST:
+                target_page_number = paginator.num_pages
+            else:
+                raise Exception('Invalid method')
+
+            if target_page_number == current_page_number:
+                # If you want the selected items to be moved to the start of the current page,
+                # then just do not return here
+                return
 
-        queryset_size = queryset.count()
-        page_size = page.end_index() - page.start_index() + 1
-        endorders_step = -1 if self.order_by.startswith('-') else 1
-        if queryset_size > page_size:
-            # move objects to last and penultimate page
-            endorders_end = getattr(objects[page.end_index() - 1], self.default_order_field) + endorders_step
-            endorders = range(
-                endorders_end - endorders_step * queryset_size,
-                endorders_end,
-                endorders_step
+            try:
+                page = paginator.page(target_page_number)
+            except EmptyPage as ex:
+                self.message_user(request, str(ex), level=messages.ERROR)
+                return
+
+            queryset_size = queryset.count()
+            page_size = page.end_index() - page.start_index() + 1
+            if queryset_size > page_size:
+                # move objects to last and penultimate page
+                position = page.end_index() - queryset_size
+            else:
+                position = page.start_index() - 1
+            self._move_items_to_position(request, queryset, position, order_by, paginator, return_orders=False)
+
+    def _move_items_to_position(self, request, queryset, position, order_by, paginator=None, return_orders=True):
+        """
+        Move the selected items, keeping their sequence, so that the first of them ends up at the
+        zero-based ``position`` of the list sorted by ``order_by``. The final permutation is computed
+        at once and written using a bounded number of statements, regardless of the number of
+        selected items. If given a ``KeysetPaginator``, the item at that position is sought through
+        its page boundaries. If ``send_move_signals`` is disabled, ``return_orders=False`` avoids
+        fetching the keys of the shifted items.
+        """
+        model = self.model
+        rank_field = self.default_order_field
+        descending = order_by.startswith('-')
+        extra_model_filters = self.get_extra_model_filters(request)
+        base_queryset = model.objects.filter(**extra_model_filters)
+
+        with transaction.atomic():
+            selected_queryset = queryset.select_for_update().order_by(order_by)
+            if not self.send_move_signals:
+                selected_queryset = selected_queryset.only(rank_field)
+            selected = list(selected_queryset)
+            count_rows(locked=len(selected))
+            if not selected:
+                return {}
+            others = base_queryset.exclude(pk__in=[obj.pk for obj in selected]).order_by(order_by)
+            if isinstance(paginator, KeysetPaginator) and paginator.descending is not None:
+                anchor = self._seek_anchor(paginator, selected, position)
+            else:
+                anchor = next(iter(others.values_list('pk', rank_field)[position:position + 1]), None)
+
+            if self.order_strategy.sparse:
+                # place the selected items into the gap just before the anchor
+                if anchor is None:
+                    bound = others.aggregate(order=(Min if descending else Max)(rank_field))['order']
+                    lower, upper = (None, bound) if descending else (bound, None)
+                elif descending:
+                    lower = anchor[1]
+                    upper = others.filter(**{f'{rank_field}__gt': anchor[1]}).aggregate(
+                        min_order=Min(rank_field)
+                    )['min_order']
+                else:
+                    lower = others.filter(**{f'{rank_field}__lt': anchor[1]}).aggregate(
+                        max_order=Max(rank_field)
+                    )['max_order']
+                    upper = anchor[1]
+                objs = selected[::-1] if descending else selected
+                updated_orders = self._place_items(others, objs, lower, upper)
+                self._advance_order_allocator(request, updated_orders)
+                return updated_orders
+
+            values = [getattr(obj, rank_field) for obj in selected]
+            if anchor is not None:
+                values.append(anchor[1])
+            span_filter = {f'{rank_field}__gte': min(values), f'{rank_field}__lte': max(values)}
+            if anchor is None:
+                # the selected items are moved to the end of the list
+                span_filter.pop(f'{rank_field}__gte' if descending else f'{rank_field}__lte')
+            span_queryset = base_queryset.filter(**span_filter)
+            if self.send_move_signals:
+                # the signals are sent for each item of the span, hence they must be loaded anyway
+                return self._rewrite_span(span_queryset, selected, anchor, order_by)
+            span = span_queryset.aggregate(count=Count('pk'), lowest=Min(rank_field), highest=Max(rank_field))
+            if span['count'] != span['highest'] - span['lowest'] + 1:
+                # with gaps or duplicates, the positions of the span can not be shifted by a constant
+                return self._rewrite_span(span_queryset, selected, anchor, order_by)
+            return self._shift_span(
+                extra_model_filters, selected, anchor, descending, span['lowest'], span['highest'], return_orders,
             )
+
+    def _shift_span(self, extra_model_filters, selected, anchor, descending, lowest, highest, return_orders):
+        """
+        Move the selected items next to the anchor, inside the span of contiguous positions from
+        ``lowest`` to ``highest``. All unselected items between two selected ones, or between a
+        selected one and the anchor, are shifted by the same distance. These runs then are updated
+        by one statement, without loading their items.
+        """
+        model = self.model
+        rank_field = self.default_order_field
+        selected = sorted(selected, key=lambda obj: getattr(obj, rank_field))
+        values = [getattr(obj, rank_field) for obj in selected]
+        # unselected items from this position onwards end up above the selected ones
+        if anchor is None:
+            threshold = lowest if descending else highest + 1
         else:
-            endorders_start = getattr(objects[page.start_index() - 1], self.default_order_field)
-            endorders = range(
-                endorders_start,
-                endorders_start + endorders_step * queryset_size,
-                endorders_step
+            threshold = anchor[1] + 1 if descending else anchor[1]
+
+        # each run is shifted down by the number of selected items below it, and up by the number of
+        # selected items, if it ends up above them
+        runs = []
+        bounds = [lowest - 1] + values + [highest + 1]
+        for index, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+            below = (start + 1, min(end, threshold) - 1, -index)
+            above = (max(start + 1, threshold), end - 1, len(values) - index)
+            runs.extend(run for run in (below, above) if run[0] <= run[1] and run[2] != 0)
+        starts = [run[0] for run in runs]
+
+        def shifted_value(value):
+            return value + runs[bisect_right(starts, value) - 1][2]
+
+        updated_orders, count = {}, 0
+        if runs:
+            runs_filter = Q()
+            for first, last, _ in runs:
+                runs_filter |= Q(**{f'{rank_field}__gte': first, f'{rank_field}__lte': last})
+            runs_queryset = model.objects.filter(runs_filter, **extra_model_filters)
+            if return_orders:
+                updated_orders = {
+                    pk: shifted_value(value) for pk, value in runs_queryset.values_list('pk', rank_field)
+                }
+            count = runs_queryset.update(**{rank_field: Case(
+                *(When(**{f'{rank_field}__gte': first, f'{rank_field}__lte': last}, then=F(rank_field) + delta)
+                  for first, last, delta in runs),
+                default=F(rank_field),
+                output_field=model._meta.get_field(rank_field),
+            )})
+
+        # the selected items follow the unselected ones ending up below them
+        first_value = threshold - sum(1 for value in values if value < threshold)
+        moved = []
+        for value, obj in enumerate(selected, first_value):
+            if getattr(obj, rank_field) != value:
+                setattr(obj, rank_field, value)
+                moved.append(obj)
+
+        model.objects.bulk_update(moved, [rank_field], batch_size=self.order_update_batch_size)
+        using = router.db_for_write(model)
+        for first, last, delta in runs:
+            items_shifted.send(
+                model,
+                order_field=rank_field,
+                start=first,
+                end=last,
+                delta=delta,
+                count=last - first + 1,
+                extra_filters=extra_model_filters,
+                using=using,
             )
+        count_rows(shifted=count + len(moved), locked=count)
+        self._order_changed()
+        updated_orders.update({obj.pk: getattr(obj, rank_field) for obj in moved})
+        return updated_orders
 
-        if page.number > current_page_number:
-            # Move forward
-            queryset = queryset.reverse()
-            endorders = reversed(endorders)
+    def _rewrite_span(self, span_queryset, selected, anchor, order_by):
+        """
+        Move the selected items next to the anchor, by loading all items of the span and
+        reassigning the positions found there to their new sequence.
+        """
+        model = self.model
+        rank_field = self.default_order_field
+        span_queryset = span_queryset.select_for_update().order_by(order_by)
+        if not self.send_move_signals:
+            span_queryset = span_queryset.only(rank_field)
+        span = list(span_queryset)
+        count_rows(locked=len(span))
+        selected_pks = {obj.pk for obj in selected}
+        sequence = [obj for obj in span if obj.pk not in selected_pks]
+        index = len(sequence)
+        if anchor is not None:
+            index = next(i for i, obj in enumerate(sequence) if obj.pk == anchor[0])
+        sequence[index:index] = [obj for obj in span if obj.pk in selected_pks]
 
-        extra_model_filters = self.get_extra_model_filters(request)
-        for obj, endorder in zip(queryset, endorders):
-            startorder = getattr(obj, self.default_order_field)
-            self._move_item(startorder, endorder, extra_model_filters)
+        updated_objects = []
+        for obj, value in zip(sequence, [getattr(obj, rank_field) for obj in span]):
+            if getattr(obj, rank_field) != value:
+                setattr(obj, rank_field, value)
+                updated_objects.append(obj)
+        using = router.db_for_write(model)
+        if self.send_move_signals:
+            for obj in updated_objects:
+                pre_save.send(model, instance=obj, update_fields=[rank_field], raw=False, using=using)
+        model.objects.bulk_update(updated_objects, [rank_field], batch_size=self.order_update_batch_size)
+        if self.send_move_signals:
+            for obj in updated_objects:
+                post_save.send(
+                    model, instance=obj, update_fields=[rank_field], raw=False, using=using, created=False,
+                )
+        count_rows(shifted=len(updated_objects))
+        self._order_changed()
+        return {obj.pk: getattr(obj, rank_field) for obj in updated_objects}
 
     def changelist_view(self, request, extra_context=None):
         extra_context = extra_context or {}
         extra_context['sortable_update_url'] = self.get_update_url(request)
+        extra_context['sortable_move_url'] = reverse(f'{self.admin_site.name}:{self._get_move_url_name()}')
+        extra_context['sortable_update_delay'] = self.update_delay
+        extra_context['sortable_order_version'] = self.get_order_version(request)
+        if self.infinite_scroll:
+            extra_context['sortable_rows_url'] = reverse(f'{self.admin_site.name}:{self._get_rows_url_name()}')
+            extra_context['sortable_window_size'] = self.infinite_scroll_window
         extra_context['base_change_list_template'] = super().change_list_template or 'admin/change_list.html'
-        return super().changelist_view(request, extra_context)
+        token = _current_request.set(request)
+        try:
+            response = super().changelist_view(request, extra_context)
+        except BaseException:
+            _reset_current_request(token)
+            raise
+        if hasattr(response, 'add_post_render_callback') and not response.is_rendered:
+            response.add_post_render_callback(lambda response: _reset_current_request(token))
+        else:
+            _reset_current_request(token)
+        return response
 
     def get_update_url(self, request):
         """
@@ -467,16 +1459,23 @@ class PolymorphicSortableAdminMixin(SortableAdminMixin):
     rather than ``SortableAdminMixin``.
     """
     def get_max_order(self, request, obj=None):
-        return self.base_model.objects.aggregate(
-            max_order=Coalesce(Max(self.default_order_field, output_field=IntegerField), 0),
-            output_field=IntegerField,
-        )['max_order']
+        with measure('get_max_order', self.model):
+            return self.base_model.objects.aggregate(
+                max_order=Coalesce(Max(self.default_order_field, output_field=IntegerField), 0),
+                output_field=IntegerField,
+            )['max_order']
 
 
 class CustomInlineFormSetMixin:
-    def __init__(self, default_order_direction=None, default_order_field=None, **kwargs):
+    def __init__(self, default_order_direction=None, default_order_field=None, order_strategy=None,
+                 order_allocator=None, bulk_create_new_items=False, **kwargs):
         self.default_order_direction = default_order_direction
         self.default_order_field = default_order_field
+        self.order_strategy = order_strategy or DenseOrdering()
+        self.order_allocator = order_allocator or MaxOrderAllocator()
+        self.bulk_create_new_items = bulk_create_new_items
+        self._allocated_orders = []
+        self._reordered_objects = None
         if default_order_field:
             if default_order_field in self.form.base_fields:
                 order_field = self.form.base_fields[default_order_field]
@@ -492,12 +1491,65 @@ class CustomInlineFormSetMixin:
         super().__init__(**kwargs)
 
     def get_max_order(self):
-        query_set = self.model.objects.filter(
-            **{self.fk.get_attname(): self.instance.pk}
-        )
-        return query_set.aggregate(
-            max_order=Coalesce(Max(self.default_order_field), 0)
-        )['max_order']
+        partition = {self.fk.get_attname(): self.instance.pk}
+        with measure('get_max_order', self.model, partition):
+            return _get_max_order(self.model.objects.filter(**partition), self.default_order_field)
+
+    def get_order_allocation_key(self):
+        """
+        Returns the key identifying the list of sortable objects belonging to the parent object
+        """
+        return _get_inline_allocation_key(self.model, self.default_order_field, self.instance._meta, self.instance.pk)
+
+    def save_existing_objects(self, commit=True):
+        """
+        Objects whose position is the only change, are updated together using one bulk query.
+        """
+        self._reordered_objects = []
+        try:
+            saved_instances = super().save_existing_objects(commit)
+            if self._reordered_objects:
+                self.model.objects.bulk_update(self._reordered_objects, [self.default_order_field])
+        finally:
+            self._reordered_objects = None
+        return saved_instances
+
+    def save_existing(self, form, obj, commit=True):
+        if commit and self._reordered_objects is not None and form.changed_data == [self.default_order_field]:
+            self._reordered_objects.append(obj)
+            return obj
+        return super().save_existing(form, obj, commit)
+
+    def _requires_order(self, obj):
+        try:
+            self.model._meta.get_field(self.default_order_field)
+        except FieldDoesNotExist:
+            return False
+        order_field_value = getattr(obj, self.default_order_field)
+        return not order_field_value or (self.order_strategy.numeric and order_field_value <= 0)
+
+    def save_new_objects(self, commit=True):
+        """
+        Allocate the positions of all new objects at once, rather than querying the highest
+        position for each of them. Optionally insert them using one bulk query.
+        """
+        forms = [
+            form for form in self.extra_forms
+            if form.has_changed() and not (self.can_delete and self._should_delete_form(form))
+        ]
+        count = sum(self._requires_order(form.instance) for form in forms)
+        if count:
+            self._allocated_orders = self.order_allocator.allocate(
+                self.order_strategy, self.get_max_order, key=self.get_order_allocation_key(), count=count,
+            )
+        if not (commit and self.bulk_create_new_items):
+            return super().save_new_objects(commit)
+
+        self.new_objects = [self.save_new(form, commit=False) for form in forms]
+        self.model.objects.bulk_create(self.new_objects)
+        for form in forms:
+            form.save_m2m()
+        return self.new_objects
 
     def save_new(self, form, commit=True):
         """
@@ -509,15 +1561,14 @@ class CustomInlineFormSetMixin:
         """
         obj = super().save_new(form, commit=False)
 
-        try:
-            self.model._meta.get_field(self.default_order_field)
-        except FieldDoesNotExist:
-            pass
-        else:
-            order_field_value = getattr(obj, self.default_order_field)
-            if order_field_value is None or order_field_value <= 0:
-                max_order = self.get_max_order()
-                setattr(obj, self.default_order_field, max_order + 1)
+        if self._requires_order(obj):
+            if self._allocated_orders:
+                order = self._allocated_orders.pop(0)
+            else:
+                order, = self.order_allocator.allocate(
+                    self.order_strategy, self.get_max_order, key=self.get_order_allocation_key(),
+                )
+            setattr(obj, self.default_order_field, order)
         if commit:
             obj.save()
         # form.save_m2m() can be called via the formset later on
@@ -533,6 +1584,9 @@ class CustomInlineFormSet(CustomInlineFormSetMixin, BaseInlineFormSet):
 
 class SortableInlineAdminMixin:
     formset = CustomInlineFormSet
+    order_strategy = None
+    order_allocator = None
+    bulk_create_new_items = False
 
     def __init__(self, parent_model, admin_site):
         if parent_model in admin_site._registry:
@@ -541,6 +1595,10 @@ class SortableInlineAdminMixin:
                     admin_site._registry[parent_model], self.__class__.__name__
                 )
         self.default_order_direction, self.default_order_field = _get_default_ordering(self.model, self)
+        if self.order_strategy is None:
+            self.order_strategy = get_order_strategy(self.model, self.default_order_field)
+        if self.order_allocator is None:
+            self.order_allocator = MaxOrderAllocator()
         super().__init__(parent_model, admin_site)
 
     def get_fields(self, *args, **kwargs):
@@ -560,18 +1618,17 @@ class SortableTabularInline(SortableInlineAdminMixin, admin.TabularInline):
 
 class CustomGenericInlineFormSet(CustomInlineFormSetMixin, BaseGenericInlineFormSet):
     def get_max_order(self):
-        query_set = self.model.objects.filter(
-            **{
-                self.ct_fk_field.name: self.instance.pk,
-                self.ct_field.name: ContentType.objects.get_for_model(
-                    self.instance,
-                    for_concrete_model=self.for_concrete_model
-                )
-            }
-        )
-        return query_set.aggregate(
-            max_order=Coalesce(Max(self.default_order_field), 0)
-        )['max_order']
+        with measure('get_max_order', self.model, {self.ct_fk_field.name: self.instance.pk}):
+            query_set = self.model.objects.filter(
+                **{
+                    self.ct_fk_field.name: self.instance.pk,
+                    self.ct_field.name: ContentType.objects.get_for_model(
+                        self.instance,
+                        for_concrete_model=self.for_concrete_model
+                    )
+                }
+            )
+            return _get_max_order(query_set, self.default_order_field)
 
 
 class SortableGenericInlineAdminMixin(SortableInlineAdminMixin):
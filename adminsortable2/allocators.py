@@ -0,0 +1,86 @@
+"""
+Allocators determine the positions of newly added items.
+
+``MaxOrderAllocator`` aggregates the highest position of the existing items for each added item.
+``CacheOrderAllocator`` keeps that value as a counter in the Django cache, which is seeded from the
+database only once and then incremented atomically, so that adding items neither queries the
+database nor hands out the same position to concurrent requests. Moving items beyond the highest
+position advances that counter as well.
+"""
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+
+class MaxOrderAllocator:
+    """
+    Positions follow the highest position of the existing items, as returned by ``get_max_order``.
+    """
+    def allocate(self, strategy, get_max_order, key, count=1):
+        """
+        Return ``count`` ascending positions for new items of the list identified by ``key``.
+        ``get_max_order`` is a callable returning the highest position of the existing items.
+        """
+        return strategy.sequence(count, after=get_max_order())
+
+    def advance(self, key, order):
+        """
+        Called after an item of the list identified by ``key`` has been moved to position
+        ``order``, so that positions allocated later follow it.
+        """
+
+    def reset(self, key):
+        """
+        Discard any state kept for the list identified by ``key``, for instance after it has
+        been reordered.
+        """
+
+
+class CacheOrderAllocator(MaxOrderAllocator):
+    """
+    Positions are taken from a counter in the cache named ``cache_alias``, which must support an
+    atomic ``incr``, as do the Redis, Memcached and local memory backends. After ``timeout``
+    seconds, the counter is seeded again from the database, so that positions freed by deleting
+    items at the end of the list are reused. Items must not be added while bypassing this
+    allocator, otherwise they may receive the same position.
+
+    String positions can not be counted and are delegated to ``MaxOrderAllocator``.
+    """
+    def __init__(self, cache_alias=DEFAULT_CACHE_ALIAS, timeout=DEFAULT_TIMEOUT, key_prefix='adminsortable2'):
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def get_cache_key(self, key):
+        return f'{self.key_prefix}:max_order:{key}'
+
+    def allocate(self, strategy, get_max_order, key, count=1):
+        if not strategy.numeric:
+            return super().allocate(strategy, get_max_order, key, count)
+        cache_key = self.get_cache_key(key)
+        step = count * strategy.gap
+        try:
+            last = self.cache.incr(cache_key, step)
+        except ValueError:
+            # not seeded yet or expired, only the first of concurrent requests adds the counter
+            self.cache.add(cache_key, get_max_order() or 0, self.timeout)
+            last = self.cache.incr(cache_key, step)
+        return strategy.sequence(count, after=last - step)
+
+    def advance(self, key, order):
+        cache_key = self.get_cache_key(key)
+        last = self.cache.get(cache_key)
+        if last is not None and last < order:
+            # since the counter only grows, incrementing it by the difference leaves it at order or
+            # beyond, even if positions have been allocated concurrently
+            try:
+                self.cache.incr(cache_key, order - last)
+            except ValueError:
+                # expired in the meantime, hence it is seeded from the database again
+                pass
+
+    def reset(self, key):
+        self.cache.delete(self.get_cache_key(key))
@@ -0,0 +1,287 @@
+"""
+Functions to find and repair inconsistencies in the field used for sorting, such as duplicate,
+missing or non-contiguous positions. They are used by the management commands ``reorder`` and
+``checkorder``, but may also be called from a data migration or a periodic task.
+"""
+from functools import reduce
+from operator import or_
+
+from django.contrib.admin import sites
+from django.contrib.contenttypes.models import ContentType
+from django.db import router, transaction
+from django.db.models import Count, F, Max, Q, Window
+from django.db.models.functions import Lag
+from django.forms.models import _get_foreign_key
+
+
+def get_partition_fields(model):
+    """
+    Return the names of the fields referring to the parent model, if ``model`` is edited through
+    a sortable inline admin class. Otherwise return an empty list.
+    """
+    from adminsortable2.admin import SortableGenericInlineAdminMixin, SortableInlineAdminMixin
+
+    for site in sites.all_sites:
+        for model_admin in site._registry.values():
+            for inline in model_admin.inlines:
+                if not issubclass(inline, SortableInlineAdminMixin):
+                    continue
+                if inline.model._meta.concrete_model is not model._meta.concrete_model:
+                    continue
+                if issubclass(inline, SortableGenericInlineAdminMixin):
+                    return [inline.ct_field, inline.ct_fk_field]
+                return [_get_foreign_key(model_admin.model, inline.model, fk_name=inline.fk_name).name]
+    return []
+
+
+def _get_keyset_filter(fields, cursor, descending=False):
+    """
+    Return a condition selecting the rows following ``cursor`` in the ascending order of
+    ``fields``, with ``NULL`` sorted last, or the rows preceding it, if ``descending``.
+    """
+    condition = Q(pk__in=[])
+    for field_name, value in reversed(list(zip(fields, cursor))):
+        if value is None:
+            beyond = Q(**{f'{field_name}__isnull': False}) if descending else Q(pk__in=[])
+            equal = Q(**{f'{field_name}__isnull': True})
+        else:
+            if descending:
+                beyond = Q(**{f'{field_name}__lt': value})
+            else:
+                beyond = Q(**{f'{field_name}__gt': value}) | Q(**{f'{field_name}__isnull': True})
+            equal = Q(**{field_name: value})
+        condition = beyond | equal & condition
+    return condition
+
+
+def renumber(queryset, order_field, strategy, partition_fields=(), offset=0, batch_size=1000,
+             progress=None, dry_run=False):
+    """
+    Renumber the rows which are not yet in their correct position and return their number.
+    Rows keep their current sequence, using the primary key to break ties and appending rows
+    without position to the end. Rows sharing the same values in ``partition_fields`` are
+    numbered separately. Numeric positions start after ``offset`` multiplied by the strategy's
+    gap. Unless ``dry_run`` is set, each batch is written in its own transaction, after which
+    ``progress`` is called with the number of updated and total rows.
+
+    The rows are read in chunks of ``batch_size``, and each chunk is written before reading the
+    next one. So that written rows keep their place in the sequence of the rows not read yet, rows
+    moving towards the start are written while reading the rows in ascending order, and all other
+    rows while reading them in descending order.
+    """
+    if progress and not dry_run:
+        num_total = renumber(queryset, order_field, strategy, partition_fields, offset, batch_size, dry_run=True)
+    model = queryset.model
+    fields = [*partition_fields, order_field, 'pk']
+    rows = queryset.values_list(*fields)
+    sizes, num_updated = {}, 0
+
+    def write(updates):
+        nonlocal num_updated
+        if not updates:
+            return
+        num_updated += len(updates)
+        if dry_run:
+            return
+        with transaction.atomic(using=router.db_for_write(model)):
+            model.objects.bulk_update(
+                [model(pk=pk, **{order_field: order}) for pk, order in updates], [order_field],
+            )
+        if progress:
+            progress(num_updated, num_total)
+
+    # ascending, the position of each row is its index inside its partition
+    condition, partition, index = None, None, 0
+    ordering = [F(field_name).asc(nulls_last=True) for field_name in fields]
+    while True:
+        chunk_rows = rows.order_by(*ordering) if condition is None else rows.order_by(*ordering).filter(condition)
+        chunk = list(chunk_rows[:batch_size])
+        updates = []
+        for *row_partition, value, pk in chunk:
+            if row_partition != partition:
+                partition, index = row_partition, 0
+            index += 1
+            sizes[tuple(partition)] = index
+            order = strategy.position(offset + index)
+            if value is not None and order < value:
+                updates.append((pk, order))
+        write(updates)
+        if len(chunk) < batch_size:
+            break
+        condition = _get_keyset_filter(fields, chunk[-1])
+
+    # descending, the position of each row is counted down from the size of its partition
+    condition, partition, index = None, None, 0
+    ordering = [F(field_name).desc(nulls_first=True) for field_name in fields]
+    while True:
+        chunk_rows = rows.order_by(*ordering) if condition is None else rows.order_by(*ordering).filter(condition)
+        chunk = list(chunk_rows[:batch_size])
+        updates = []
+        for *row_partition, value, pk in chunk:
+            if row_partition != partition:
+                partition, index = row_partition, sizes[tuple(row_partition)] + 1
+            index -= 1
+            order = strategy.position(offset + index)
+            if value is None or order > value:
+                updates.append((pk, order))
+        write(updates)
+        if len(chunk) < batch_size:
+            break
+        condition = _get_keyset_filter(fields, chunk[-1], descending=True)
+        if not dry_run:
+            # the rows read have been moved to their final positions, so continue below the last one
+            *row_partition, value, pk = chunk[-1]
+            last = (*row_partition, strategy.position(offset + index), pk)
+            if value is None:
+                # rows without position are sorted last, so those not read yet are still found there
+                condition &= Q(**{f'{order_field}__isnull': True})
+                condition |= _get_keyset_filter(fields, last, descending=True)
+            else:
+                condition = _get_keyset_filter(fields, last, descending=True)
+    return num_updated
+
+
+def find_defects(queryset, order_field, strategy, partition_fields=()):
+    """
+    Return a list of dicts, one for each partition containing duplicate positions, positions
+    set to ``NULL``, or, for dense ordering, gaps between consecutive positions. Each kind of
+    defect is detected by one query, regardless of the number of partitions.
+    """
+    defects = {}
+
+    def get_defect(row):
+        key = tuple(row[field_name] for field_name in partition_fields)
+        if key not in defects:
+            defects[key] = {
+                'partition': {field_name: row[field_name] for field_name in partition_fields},
+                'duplicates': [],
+                'gaps': [],
+                'nulls': 0,
+                'max_position': None,
+            }
+        return defects[key]
+
+    duplicates = queryset.filter(**{f'{order_field}__isnull': False}).values(
+        *partition_fields, order_field,
+    ).annotate(num_rows=Count('pk')).filter(num_rows__gt=1).order_by(*partition_fields, order_field)
+    for row in duplicates:
+        get_defect(row)['duplicates'].append(row[order_field])
+
+    nulls = queryset.values(*partition_fields).annotate(
+        num_nulls=Count('pk', filter=Q(**{f'{order_field}__isnull': True})),
+        max_position=Max(order_field),
+    ).filter(num_nulls__gt=0).order_by(*partition_fields)
+    for row in nulls:
+        defect = get_defect(row)
+        defect['nulls'] = row['num_nulls']
+        defect['max_position'] = row['max_position']
+
+    if not strategy.sparse:
+        previous = Window(
+            Lag(order_field),
+            partition_by=[F(field_name) for field_name in partition_fields] or None,
+            order_by=F(order_field).asc(),
+        )
+        gaps = queryset.filter(**{f'{order_field}__isnull': False}).annotate(previous=previous).filter(
+            Q(previous__isnull=True) & ~Q(**{order_field: strategy.gap})
+            | Q(previous__isnull=False)
+            & ~Q(**{order_field: F('previous')})
+            & ~Q(**{order_field: F('previous') + strategy.gap})
+        ).values(*partition_fields, order_field, 'previous')
+        for row in gaps:
+            get_defect(row)['gaps'].append([row['previous'], row[order_field]])
+
+    return [defects[key] for key in sorted(defects, key=lambda key: [str(value) for value in key])]
+
+
+def filter_partitions(queryset, defects):
+    """
+    Restrict the queryset to the partitions of the given defects.
+    """
+    if not defects:
+        return queryset.none()
+    conditions = [Q(**defect['partition']) for defect in defects if defect['partition']]
+    if not conditions:
+        return queryset
+    return queryset.filter(reduce(or_, conditions))
+
+
+def _get_healthy_prefix(defect, strategy):
+    """
+    Return the highest position up to which all positions of the partition are correct, or
+    ``None`` if already its first position is defective.
+    """
+    candidates = [value - strategy.gap for value in defect['duplicates']]
+    candidates.extend(0 if previous is None else previous for previous, value in defect['gaps'])
+    prefix = min(candidates) if candidates else defect['max_position']
+    if prefix is None or prefix <= 0:
+        return None
+    return prefix
+
+
+def repair_defects(queryset, order_field, strategy, defects, batch_size=1000):
+    """
+    Renumber the rows of each defective partition, starting at its first defect, so that rows
+    in front of it as well as healthy partitions remain untouched. If the first position is
+    defective, all rows of the partition are renumbered, including those at zero or below.
+    Return the number of updated rows.
+    """
+    num_updated = 0
+    for defect in defects:
+        rows = queryset.filter(**defect['partition'])
+        offset = 0
+        prefix = _get_healthy_prefix(defect, strategy) if strategy.numeric else None
+        if prefix is not None:
+            rows = rows.filter(Q(**{f'{order_field}__gt': prefix}) | Q(**{f'{order_field}__isnull': True}))
+            offset = prefix // strategy.gap
+        num_updated += renumber(rows, order_field, strategy, offset=offset, batch_size=batch_size)
+    return num_updated
+
+
+def reset_order_allocators(queryset, order_field):
+    """
+    Discard the state kept by the order allocators of all sortable admin classes editing the rows
+    of ``queryset``, for each list containing them. Call this after renumbering these rows,
+    otherwise new items may receive positions which are already taken.
+    """
+    from adminsortable2.admin import (
+        SortableAdminMixin, SortableGenericInlineAdminMixin, SortableInlineAdminMixin, _get_default_ordering,
+        _get_inline_allocation_key,
+    )
+
+    concrete_model = queryset.model._meta.concrete_model
+    for site in sites.all_sites:
+        for model_admin in site._registry.values():
+            if (isinstance(model_admin, SortableAdminMixin)
+                    and model_admin.model._meta.concrete_model is concrete_model
+                    and model_admin.default_order_field == order_field):
+                model_admin.order_allocator.reset(model_admin.get_order_allocation_key(None))
+            for inline in model_admin.inlines:
+                if not issubclass(inline, SortableInlineAdminMixin) or inline.order_allocator is None:
+                    continue
+                if inline.model._meta.concrete_model is not concrete_model:
+                    continue
+                inline_order_field = _get_default_ordering(inline.model, inline)[1]
+                if inline_order_field != order_field:
+                    continue
+                if issubclass(inline, SortableGenericInlineAdminMixin):
+                    content_type = ContentType.objects.get_for_model(model_admin.model)
+                    parent_pks = queryset.filter(**{inline.ct_field: content_type}).values_list(inline.ct_fk_field)
+                else:
+                    fk = _get_foreign_key(model_admin.model, inline.model, fk_name=inline.fk_name)
+                    parent_pks = queryset.values_list(fk.attname)
+                for parent_pk, in parent_pks.order_by().distinct().iterator():
+                    inline.order_allocator.reset(
+                        _get_inline_allocation_key(inline.model, order_field, model_admin.model._meta, parent_pk)
+                    )
+
+
+def bump_order_version(queryset, order_field):
+    """
+    Increment the version of the sorted list containing the rows of ``queryset``. Call this after
+    renumbering these rows, so that the cached boundaries of its pages are discarded and browsers
+    showing the list reload it.
+    """
+    from adminsortable2.admin import _bump_order_version
+
+    return _bump_order_version(queryset.model, order_field)
@@ -0,0 +1,91 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections, router
+
+from adminsortable2.signals import order_operation
+
+logger = logging.getLogger('adminsortable2')
+
+_measurements = ContextVar('adminsortable2_measurements', default=())
+
+
+class Measurement:
+    """
+    Figures collected while running one ordering operation, such as moving an item.
+    """
+    def __init__(self, operation, model, partition=None, payload_size=None):
+        self.operation = operation
+        self.model = model
+        self.partition = partition
+        self.payload_size = payload_size
+        self.duration = None
+        self.queries = 0
+        self.rows_shifted = 0
+        self.rows_locked = 0
+        self.failed = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # used as database execute wrapper
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def as_dict(self):
+        return {
+            'operation': self.operation,
+            'label': self.model._meta.label,
+            'partition': self.partition,
+            'duration': self.duration,
+            'queries': self.queries,
+            'rows_shifted': self.rows_shifted,
+            'rows_locked': self.rows_locked,
+            'payload_size': self.payload_size,
+            'failed': self.failed,
+        }
+
+
+@contextmanager
+def measure(operation, model, partition=None, payload_size=None):
+    """
+    Measure the wall time and number of queries of an ordering operation on ``model``. When
+    leaving, the figures are reported through the signal ``order_operation`` and logged with
+    level DEBUG using the logger named "adminsortable2".
+    """
+    measurement = Measurement(operation, model, partition, payload_size)
+    token = _measurements.set(_measurements.get() + (measurement,))
+    connection = connections[router.db_for_write(model)]
+    start = time.perf_counter()
+    try:
+        with connection.execute_wrapper(measurement):
+            yield measurement
+    except Exception:
+        measurement.failed = True
+        raise
+    finally:
+        measurement.duration = time.perf_counter() - start
+        _measurements.reset(token)
+        report(measurement)
+
+
+def count_rows(shifted=0, locked=0):
+    """
+    Add the number of shifted and locked rows to all operations currently being measured, so that
+    an operation includes the rows of the operations it is composed of.
+    """
+    for measurement in _measurements.get():
+        measurement.rows_shifted += shifted
+        measurement.rows_locked += locked
+
+
+def report(measurement):
+    figures = measurement.as_dict()
+    order_operation.send(sender=measurement.model, **figures)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "%(operation)s on %(label)s took %(duration).4fs using %(queries)d queries, "
+            "shifting %(rows_shifted)d and locking %(rows_locked)d rows",
+            figures,
+            extra={'adminsortable2': figures},
+        )
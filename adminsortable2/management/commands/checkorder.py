@@ -0,0 +1,97 @@
+import json
+
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from adminsortable2.consistency import (
+    bump_order_version, filter_partitions, find_defects, get_partition_fields, repair_defects,
+    reset_order_allocators,
+)
+from adminsortable2.ordering import get_order_strategy
+
+
+class Command(BaseCommand):
+    args = '<model model ...>'
+    help = (
+        "Report duplicate, missing or non-contiguous positions in the ordering field of a model "
+        "as JSON. With --repair, only the rows following the first defect of each affected "
+        "partition are renumbered."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='+', type=str)
+        parser.add_argument(
+            '--partition-by',
+            action='append',
+            default=[],
+            metavar='FIELD',
+            help="Check the rows separately for each value of this field, usually the foreign key "
+                 "of a sortable inline. Repeat for generic foreign keys. By default, this is detected "
+                 "from the sortable inline admin classes using this model.",
+        )
+        parser.add_argument(
+            '--no-partition',
+            action='store_true',
+            help="Check all rows of the model as one sequence",
+        )
+        parser.add_argument(
+            '--repair',
+            action='store_true',
+            help="Renumber the rows of defective partitions, starting at their first defect",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Number of rows updated per transaction while repairing",
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("The batch size must be a positive number")
+        reports = []
+        for modelname in options['models']:
+            try:
+                app_label, model_name = modelname.rsplit('.', 1)
+                Model = apps.get_model(app_label, model_name)
+            except (LookupError, ValueError):
+                raise CommandError('Unable to load model "%s"' % modelname)
+
+            if not hasattr(Model._meta, 'ordering') or len(Model._meta.ordering) == 0:
+                raise CommandError(f'Model "{modelname}" does not define field "ordering" in its Meta class')
+
+            orderfield = Model._meta.ordering[0]
+            if orderfield[0] == '-':
+                orderfield = orderfield[1:]
+            strategy = get_order_strategy(Model, orderfield)
+
+            if options['no_partition']:
+                partition_fields = []
+            else:
+                partition_fields = options['partition_by'] or get_partition_fields(Model)
+            for field_name in partition_fields:
+                try:
+                    Model._meta.get_field(field_name)
+                except FieldDoesNotExist:
+                    raise CommandError(f'Model "{modelname}" has no field named "{field_name}"')
+
+            queryset = Model.objects.all()
+            defects = find_defects(queryset, orderfield, strategy, partition_fields)
+            report = {
+                'model': Model._meta.label,
+                'order_field': orderfield,
+                'partition_by': partition_fields,
+                'defects': defects,
+            }
+            if options['repair']:
+                report['repaired_rows'] = repair_defects(
+                    queryset, orderfield, strategy, defects, batch_size=options['batch_size'],
+                )
+                if defects:
+                    reset_order_allocators(filter_partitions(queryset, defects), orderfield)
+                    bump_order_version(queryset, orderfield)
+            reports.append(report)
+
+        self.stdout.write(json.dumps(reports, indent=2, cls=DjangoJSONEncoder))
@@ -1,15 +1,64 @@
 from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
 from django.core.management.base import BaseCommand, CommandError
 
+from adminsortable2.consistency import (
+    bump_order_version, filter_partitions, find_defects, get_partition_fields, renumber, reset_order_allocators,
+)
+from adminsortable2.instrumentation import count_rows, measure
+from adminsortable2.ordering import SparseOrdering, get_order_strategy
+
 
 class Command(BaseCommand):
     args = '<model model ...>'
-    help = 'Restore the primary ordering fields of a model containing a special ordering field'
+    help = (
+        "Restore the primary ordering fields of a model containing a special ordering field. "
+        "Rows already containing their correct position are skipped, and each batch is committed "
+        "separately, so that an interrupted run can just be restarted."
+    )
 
     def add_arguments(self, parser):
         parser.add_argument('models', nargs='+', type=str)
+        parser.add_argument(
+            '--gap',
+            type=int,
+            default=1,
+            help="Distance between consecutive positions, use a value greater than 1 for sparse ordering",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Number of rows read at once, whose changes are committed in one transaction",
+        )
+        parser.add_argument(
+            '--partition-by',
+            action='append',
+            default=[],
+            metavar='FIELD',
+            help="Number the rows separately for each value of this field, usually the foreign key "
+                 "of a sortable inline. Repeat for generic foreign keys. By default, this is detected "
+                 "from the sortable inline admin classes using this model.",
+        )
+        parser.add_argument(
+            '--no-partition',
+            action='store_true',
+            help="Number all rows of the model in one sequence",
+        )
+        parser.add_argument(
+            '--only-defective',
+            action='store_true',
+            help="Only process partitions containing duplicate, missing or non-contiguous positions",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Only report the number of rows to be updated, without changing them",
+        )
 
     def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("The batch size must be a positive number")
         for modelname in options['models']:
             try:
                 app_label, model_name = modelname.rsplit('.', 1)
@@ -24,8 +73,46 @@ class Command(BaseCommand):
             if orderfield[0] == '-':
                 orderfield = orderfield[1:]
 
-            for order, obj in enumerate(Model.objects.iterator(), start=1):
-                setattr(obj, orderfield, order)
-                obj.save()
+            strategy = get_order_strategy(Model, orderfield)
+            if strategy.numeric and options['gap'] > 1:
+                strategy = SparseOrdering(gap=options['gap'])
+
+            if options['no_partition']:
+                partition_fields = []
+            else:
+                partition_fields = options['partition_by'] or get_partition_fields(Model)
+            for field_name in partition_fields:
+                try:
+                    Model._meta.get_field(field_name)
+                except FieldDoesNotExist:
+                    raise CommandError(f'Model "{modelname}" has no field named "{field_name}"')
+            if partition_fields and options['verbosity'] > 1:
+                self.stdout.write(f'Numbering rows separately for each {", ".join(partition_fields)}')
+
+            with measure('reorder', Model, partition_fields or None):
+                queryset = Model.objects.all()
+                if options['only_defective']:
+                    defects = find_defects(queryset, orderfield, strategy, partition_fields)
+                    queryset = filter_partitions(queryset, defects)
+                if options['dry_run']:
+                    num_updates = renumber(
+                        queryset, orderfield, strategy, partition_fields, batch_size=options['batch_size'],
+                        dry_run=True,
+                    )
+                    self.stdout.write(f'{num_updates} rows of model "{modelname}" require reordering')
+                    continue
+
+                if options['verbosity'] > 1:
+                    def progress(num_updated, num_total):
+                        self.stdout.write(f'Reordered {num_updated} of {num_total} rows')
+                else:
+                    progress = None
+                num_updates = renumber(
+                    queryset, orderfield, strategy, partition_fields, batch_size=options['batch_size'],
+                    progress=progress,
+                )
+                count_rows(shifted=num_updates)
+                reset_order_allocators(queryset, orderfield)
+                bump_order_version(queryset, orderfield)
 
             self.stdout.write(f'Successfully reordered model "{modelname}"')
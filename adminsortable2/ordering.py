@@ -0,0 +1,163 @@
+"""
+Strategies computing the values stored in the field used for sorting.
+
+``DenseOrdering`` numbers items consecutively, so moving an item shifts the positions of all
+items in between. ``SparseOrdering`` leaves gaps between positions, so that an item can be
+moved by updating just its own row. ``LexicographicOrdering`` stores string keys in a
+``CharField``, which never run out of room between two neighbours.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+
+DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+
+
+class DenseOrdering:
+    """
+    Positions are consecutive integers, starting at 1.
+    """
+    sparse = False
+    numeric = True
+    gap = 1
+
+    def after(self, value):
+        """
+        Return the position following ``value``. Use ``None`` for an empty list.
+        """
+        return (value or 0) + self.gap
+
+    def between(self, lower, upper):
+        """
+        Return a position strictly between ``lower`` and ``upper`` or ``None`` if there is no
+        room left. Use ``None`` for ``lower`` or ``upper`` to denote an open end.
+        """
+        return None
+
+    def sequence(self, count, after=None):
+        """
+        Return ``count`` ascending positions following ``after``.
+        """
+        values, value = [], after
+        for _ in range(count):
+            value = self.after(value)
+            values.append(value)
+        return values
+
+    def position(self, index):
+        """
+        Return the position of the ``index``-th item, counting from 1, of a list numbered by
+        ``sequence()``.
+        """
+        return index * self.gap
+
+    def spread(self, lower, upper, count):
+        """
+        Return ``count`` ascending positions strictly between ``lower`` and ``upper`` or ``None``
+        if there is not enough room left.
+        """
+        if upper is None:
+            return self.sequence(count, after=lower)
+        if count == 0:
+            return []
+        middle = self.between(lower, upper)
+        if middle is None:
+            return None
+        head = self.spread(lower, middle, count // 2)
+        tail = self.spread(middle, upper, count - count // 2 - 1)
+        if head is None or tail is None:
+            return None
+        return head + [middle] + tail
+
+
+class SparseOrdering(DenseOrdering):
+    """
+    Positions are multiples of ``gap``. Moving an item assigns the midpoint of its new neighbours.
+    Only if there is no room left, a small window of neighbouring items is renumbered.
+    """
+    sparse = True
+
+    def __init__(self, gap=1024):
+        if gap < 2:
+            raise ValueError("SparseOrdering requires a gap of at least 2")
+        self.gap = gap
+
+    def between(self, lower, upper):
+        if upper is None:
+            return self.after(lower)
+        lower = 0 if lower is None else lower
+        middle = (lower + upper) // 2
+        return middle if lower < middle < upper else None
+
+
+class LexicographicOrdering(DenseOrdering):
+    """
+    Positions are strings, each read as a base-62 fraction between 0 and 1. Since those strings
+    never end in ``'0'``, their lexicographic order is the order of the fractions they represent.
+    There always is room between two positions, the generated keys just become longer.
+
+    New items are appended by incrementing the leading ``width`` digits by ``gap``.
+    """
+    sparse = True
+    numeric = False
+
+    def __init__(self, width=6, gap=len(DIGITS) ** 2):
+        self.width = width
+        self.gap = gap
+
+    @staticmethod
+    def _to_int(key, length):
+        number = 0
+        for digit in key.ljust(length, DIGITS[0]):
+            number = number * len(DIGITS) + DIGITS.index(digit)
+        return number
+
+    @staticmethod
+    def _to_key(number, length):
+        digits = []
+        for _ in range(length):
+            number, remainder = divmod(number, len(DIGITS))
+            digits.append(DIGITS[remainder])
+        return ''.join(reversed(digits)).rstrip(DIGITS[0])
+
+    def _midpoint(self, lower, upper):
+        lower = lower or ''
+        length = max(len(lower), len(upper or ''), 1)
+        low = self._to_int(lower, length)
+        high = len(DIGITS) ** length if upper is None else self._to_int(upper, length)
+        if low >= high:
+            return None
+        while high - low < 2:
+            low, high, length = low * len(DIGITS), high * len(DIGITS), length + 1
+        return self._to_key((low + high) // 2, length)
+
+    def after(self, value):
+        number = self._to_int((value or '')[:self.width], self.width) + self.gap
+        if number < len(DIGITS) ** self.width:
+            return self._to_key(number, self.width)
+        return self._midpoint(value, None)
+
+    def position(self, index):
+        # only the keys following the last one of the leading digits depend on their predecessor
+        limit = (len(DIGITS) ** self.width - 1) // self.gap
+        value = self._to_key(min(index, limit) * self.gap, self.width)
+        for _ in range(index - limit):
+            value = self.after(value)
+        return value
+
+    def between(self, lower, upper):
+        if upper is None:
+            return self.after(lower)
+        return self._midpoint(lower, upper)
+
+
+def get_order_strategy(model, field_name):
+    """
+    Return the default ordering strategy for the given field.
+    """
+    try:
+        field = model._meta.get_field(field_name)
+    except FieldDoesNotExist:
+        return DenseOrdering()
+    if isinstance(field, models.CharField):
+        return LexicographicOrdering()
+    return DenseOrdering()
@@ -0,0 +1,117 @@
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.paginator import Paginator
+from django.db.models import F, OrderBy
+from django.utils.functional import cached_property
+
+
+class KeysetPaginator(Paginator):
+    """
+    Paginator for lists sorted by the ordering field of a sortable model. Instead of fetching the
+    items of a page using OFFSET, which makes the database read and discard all preceding rows, the
+    first item of each page is sought by reading only the keys of the items from the nearest known
+    page boundary onwards. Then the page is fetched by filtering on positions beyond that item.
+    Without any known boundary, this still skips all keys in front of the page, or behind it.
+
+    If the list is sorted by another column, it falls back to the behaviour of Django's paginator.
+    The values of the ordering field must be unique.
+
+    If ``cache`` and ``cache_key`` are given, the number of items and the boundaries of all pages
+    sought so far are kept in that cache. This key must change whenever the list changes, and the
+    cache must be shared by all processes, otherwise they would read outdated boundaries.
+    """
+    def __init__(self, object_list, per_page, orphans=0, allow_empty_first_page=True, order_field=None,
+                 cache=None, cache_key=None, cache_timeout=DEFAULT_TIMEOUT):
+        super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+        self.order_field = order_field
+        self.cache = cache
+        self.cache_key = cache_key if cache is not None else None
+        self.cache_timeout = cache_timeout
+        index = cache.get(self.cache_key) if self.cache_key else None
+        # maps page numbers onto the primary key and position of their first item
+        self.boundaries = dict(index['boundaries']) if index else {}
+        if index:
+            self.__dict__['count'] = index['count']
+
+    @cached_property
+    def descending(self):
+        """
+        True or False if the list is sorted by the ordering field, otherwise None.
+        """
+        if self.order_field is None or not hasattr(self.object_list, 'query'):
+            return None
+        ordering = self.object_list.query.order_by
+        if not ordering:
+            return None
+        part = ordering[0]
+        if isinstance(part, str):
+            descending, field_name = part.startswith('-'), part.lstrip('-')
+        elif isinstance(part, OrderBy) and isinstance(part.expression, F):
+            descending, field_name = part.descending, part.expression.name
+        else:
+            return None
+        return descending if field_name == self.order_field else None
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.descending is None or self.count == 0:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        boundary = self.get_boundary(number)
+        object_list = self.object_list.filter(**{self._get_lookup(): boundary[1]})[:top - bottom]
+        return self._get_page(object_list, number, self)
+
+    def get_boundary(self, number):
+        """
+        Returns the primary key and position of the first item on page ``number``.
+        """
+        if number not in self.boundaries:
+            self.boundaries[number] = self._seek((number - 1) * self.per_page)
+            self._store_index()
+        return self.boundaries[number]
+
+    def get_item_at(self, index):
+        """
+        Returns the primary key and position of the item at the zero-based ``index`` of the list,
+        or None if the list is shorter.
+        """
+        if index >= self.count:
+            return None
+        number, offset = divmod(index, self.per_page)
+        boundary = self.get_boundary(number + 1)
+        if offset == 0:
+            return boundary
+        return self._get_keys().filter(**{self._get_lookup(): boundary[1]})[offset]
+
+    @cached_property
+    def count(self):
+        count = super().count
+        self._store_index(count)
+        return count
+
+    def _store_index(self, count=None):
+        if self.cache_key:
+            index = {'count': self.count if count is None else count, 'boundaries': self.boundaries}
+            self.cache.set(self.cache_key, index, self.cache_timeout)
+
+    def _get_keys(self):
+        return self.object_list.values_list('pk', self.order_field)
+
+    def _get_lookup(self):
+        return f'{self.order_field}__{"lte" if self.descending else "gte"}'
+
+    def _seek(self, index):
+        # start from the nearest known page boundary, or from the end of the list, if closer
+        known = [(number, boundary) for number, boundary in self.boundaries.items()
+                 if (number - 1) * self.per_page <= index]
+        if known:
+            number, boundary = max(known)
+            keys = self._get_keys().filter(**{self._get_lookup(): boundary[1]})
+            distance = index - (number - 1) * self.per_page
+        else:
+            keys, distance = self._get_keys(), index
+        if self.count - 1 - index < distance:
+            return self._get_keys().reverse()[self.count - 1 - index]
+        return keys[distance]
@@ -0,0 +1,16 @@
+from django.dispatch import Signal
+
+# Sent once for each range of items shifted by a move using a single UPDATE statement. This
+# replaces the `pre_save` and `post_save` signals for each shifted item, whenever the admin class
+# sets `send_move_signals = False`. Besides the model class as `sender`, receivers get the name
+# of the `order_field`, the shifted range `start` ... `end` (before applying `delta`), the
+# `count` of shifted items, the `extra_filters` restricting the list and the database alias `using`.
+items_shifted = Signal()
+
+# Sent after each ordering operation, such as updating the positions of dragged items, moving an
+# item, moving selected items to another page, determining the highest position or renumbering
+# a model. Besides the model class as `sender`, receivers get the name of the `operation`, the
+# model's `label`, the `partition` of the list, for instance the filters restricting it, the wall
+# time as `duration` in seconds, the number of `queries`, of `rows_shifted` and of `rows_locked`,
+# the `payload_size` of the request in bytes, if any, and whether the operation `failed`.
+order_operation = Signal()
@@ -2,6 +2,10 @@ import Sortable, { MoveEvent, MultiDrag, SortableEvent } from 'sortablejs';
 
 Sortable.mount(new MultiDrag());
 
+type Move = {items: Array<string>, before?: string, after?: string};
+
+type Row = {pk: string, order: number | string, html: string};
+
 class ListSortable {
 	private readonly tableBody: HTMLTableSectionElement;
 	private readonly config: any;
@@ -9,10 +13,23 @@ class ListSortable {
 	private readonly observer: MutationObserver;
 	private firstOrder: number | undefined;
 	private orderDirection: number | undefined;
+	private lexicographic = false;
+	private readonly clientId = Math.random().toString(36).slice(2);
+	private sequence = 0;
+	// null if the server keeps no version shared by all its processes
+	private version: number | null;
+	private pendingMoves: Array<Move> = [];
+	private pendingTimeout: number | undefined;
+	private sending: Promise<void> = Promise.resolve();
+	private dragging = false;
+	private loading = false;
+	private moreBefore = false;
+	private moreAfter = false;
 
 	constructor(table: HTMLTableElement, config: any) {
 		this.tableBody = table.querySelector('tbody')!;
 		this.config = config;
+		this.version = config.version ?? null;
 		this.sortable = Sortable.create(this.tableBody, {
 			animation: 150,
 			handle: '.handle',
@@ -22,22 +39,107 @@ class ListSortable {
 			onStart: event => this.onStart(event),
 			onEnd: event => this.onEnd(event),
 		});
+		// Django's actions.js toggles the class of selected rows without dispatching any event,
+		// hence one observer on the table body mirrors these changes onto all rows
 		this.observer = new MutationObserver(mutationsList => this.selectActionChanged(mutationsList));
-		const tableRows = this.tableBody.querySelectorAll('tr');
-		tableRows.forEach(tableRow => this.observer.observe(tableRow, {attributes: true}));
+		this.observer.observe(this.tableBody, {subtree: true, attributeFilter: ['class']});
+		window.addEventListener('pagehide', () => this.flush());
+		// one listener also handles the buttons of rows loaded later on
+		this.tableBody.addEventListener('click', event => this.moveButtonClicked(event.target));
+		this.moreBefore = config.current_page > 1;
+		this.moreAfter = config.current_page < config.total_pages;
+		if (config.rows_url) {
+			// rows of the neighbouring pages are loaded while scrolling, so that items can be dragged onto them
+			window.addEventListener('scroll', () => this.scrolled(), {passive: true});
+			this.scrolled();
+		}
+	}
+
+	private scrolled() {
+		if (this.loading)
+			return;
+		const rect = this.tableBody.getBoundingClientRect();
+		if (this.moreAfter && rect.bottom < 2 * window.innerHeight) {
+			this.loadRows('after');
+		} else if (this.moreBefore && rect.top > -window.innerHeight && !this.dragging) {
+			// prepending rows while dragging would invalidate the indices reported by SortableJS
+			this.loadRows('before');
+		}
+	}
+
+	private async loadRows(direction: 'after' | 'before') {
+		const edgeRow = direction === 'after' ? this.tableBody.lastElementChild : this.tableBody.firstElementChild;
+		const order = edgeRow?.querySelector('.handle')?.getAttribute('order');
+		const pk = edgeRow?.querySelector('.handle')?.getAttribute('pk');
+		if (!order || !pk)
+			return;
+		this.loading = true;
+		try {
+			// wait until the server has applied all moves, otherwise the loaded positions are outdated
+			this.flush();
+			await this.sending;
+			const params = new URLSearchParams(window.location.search);
+			params.delete('p');
+			params.set(direction, order);
+			params.set('last_pk', pk);
+			const response = await fetch(`${this.config.rows_url}?${params}`, {headers: {'Accept': 'application/json'}});
+			if (response.status !== 200) {
+				console.error(`The server responded: ${response.statusText}`);
+				return;
+			}
+			const data: {rows: Array<Row>, more: boolean} = await response.json();
+			const template = document.createElement('template');
+			template.innerHTML = data.rows.map(row => row.html).join('');
+			if (direction === 'after') {
+				this.tableBody.append(template.content);
+				this.moreAfter = data.more;
+			} else {
+				this.keepScrollPosition(() => this.tableBody.prepend(template.content));
+				this.moreBefore = data.more;
+			}
+			this.trimRows(direction);
+		} finally {
+			this.loading = false;
+		}
+		window.requestAnimationFrame(() => this.scrolled());
+	}
+
+	private trimRows(loaded: 'after' | 'before') {
+		// render only a window of rows, removing those on the opposite side of the loaded ones
+		const excess = this.tableBody.rows.length - this.config.window_size;
+		if (excess <= 0 || this.dragging)
+			return;
+		const rows = Array.from(this.tableBody.rows);
+		if (loaded === 'after') {
+			this.keepScrollPosition(() => rows.slice(0, excess).forEach(row => row.remove()));
+			this.moreBefore = true;
+		} else {
+			rows.slice(-excess).forEach(row => row.remove());
+			this.moreAfter = true;
+		}
+	}
+
+	private keepScrollPosition(changeRows: () => void) {
+		// adding or removing rows above the viewport shall not move the rows shown
+		const height = this.tableBody.offsetHeight;
+		changeRows();
+		window.scrollBy(0, this.tableBody.offsetHeight - height);
 	}
 
 	private selectActionChanged(mutationsList: Array<MutationRecord>) {
+		const tableRows = new Set<HTMLTableRowElement>();
 		for (const mutation of mutationsList) {
-			if (mutation.type === 'attributes' && mutation.attributeName === 'class') {
-				const tableRow = mutation.target as HTMLTableRowElement;
-				if (tableRow.classList.contains('selected')) {
-					Sortable.utils.select(tableRow);
-				} else {
-					Sortable.utils.deselect(tableRow);
-				}
+			if (mutation.target.parentNode === this.tableBody) {
+				tableRows.add(mutation.target as HTMLTableRowElement);
 			}
 		}
+		tableRows.forEach(tableRow => {
+			if (tableRow.classList.contains('selected')) {
+				Sortable.utils.select(tableRow);
+			} else {
+				Sortable.utils.deselect(tableRow);
+			}
+		});
 	}
 
 	private async onStart(evt: SortableEvent) {
@@ -45,14 +147,23 @@ class ListSortable {
 		const firstOrder = this.tableBody.querySelector('tr:first-child')?.querySelector('.handle')?.getAttribute('order');
 		const lastOrder = this.tableBody.querySelector('tr:last-child')?.querySelector('.handle')?.getAttribute('order');
 		if (firstOrder && lastOrder) {
-			this.firstOrder = parseInt(firstOrder);
-			this.orderDirection = parseInt(lastOrder) > this.firstOrder ? 1 : -1;
+			this.lexicographic = !/^-?\d+$/.test(firstOrder) || !/^-?\d+$/.test(lastOrder);
+			if (this.lexicographic) {
+				// string keys are generated by the server, here only the sequence of the posted items matters
+				this.firstOrder = 0;
+				this.orderDirection = lastOrder > firstOrder ? 1 : -1;
+			} else {
+				this.firstOrder = parseInt(firstOrder);
+				this.orderDirection = parseInt(lastOrder) > this.firstOrder ? 1 : -1;
+			}
 		}
 		this.tableBody.classList.add('ignore-list-changes');
+		this.dragging = true;
 	}
 
 	private async onEnd(evt: SortableEvent) {
 		this.tableBody.classList.remove('ignore-list-changes');
+		this.dragging = false;
 		if (typeof evt.newIndex !== 'number' || typeof evt.oldIndex !== 'number'
 			|| typeof this.firstOrder !== 'number'|| typeof this.orderDirection !== 'number'
 			|| !(evt.item instanceof HTMLTableRowElement))
@@ -90,39 +201,152 @@ class ListSortable {
 		if (updatedRows.length === 0)
 			return;
 
-		let order;
-		if (firstChild === 0) {
-			order = this.firstOrder;
-		} else {
-			order = this.tableBody.querySelector(`tr:nth-child(${firstChild}) .handle`)?.getAttribute('order');
-			if (!order)
-				return;
-			order = parseInt(order) + this.orderDirection;
-		}
- 		const updatedItems = new Map<string, number>();
-		for (let row of updatedRows) {
-			const pk = row.querySelector('.handle')?.getAttribute('pk');
-			if (pk) {
-				row.querySelector('.handle')?.setAttribute('order', String(order));
-				updatedItems.set(pk, order);
-				order += this.orderDirection;
+		if (!this.lexicographic) {
+			// keep the positions shown in the list consistent, so that the sorting direction can be detected
+			let order;
+			if (firstChild === 0) {
+				order = this.firstOrder;
+			} else {
+				order = this.tableBody.querySelector(`tr:nth-child(${firstChild}) .handle`)?.getAttribute('order');
+				if (!order)
+					return;
+				order = parseInt(order) + this.orderDirection;
+			}
+			for (let row of updatedRows) {
+				const handle = row.querySelector('.handle');
+				if (handle?.getAttribute('pk')) {
+					handle.setAttribute('order', String(order));
+					order += this.orderDirection;
+				}
 			}
 		}
+		const move = this.getMove(evt.items.length === 0 ? [evt.item] : evt.items);
+		if (move) {
+			this.enqueue(move);
+		}
+	}
 
+	private getMove(draggedRows: Array<HTMLElement>): Move | undefined {
+		// after dropping, the dragged rows are adjacent, hence their neighbour serves as anchor
+		const rows = Array.from(this.tableBody.querySelectorAll('tr')).filter(row => draggedRows.includes(row));
+		const items = rows.map(row => row.querySelector('.handle')?.getAttribute('pk')).filter(pk => pk) as Array<string>;
+		if (items.length === 0 || typeof this.orderDirection !== 'number')
+			return;
+		const nextPk = rows[rows.length - 1].nextElementSibling?.querySelector('.handle')?.getAttribute('pk');
+		const previousPk = rows[0].previousElementSibling?.querySelector('.handle')?.getAttribute('pk');
+		// the server interprets "before" and "after" in terms of ascending positions
+		if (nextPk) {
+			return this.orderDirection > 0 ? {items: items, before: nextPk} : {items: items, after: nextPk};
+		}
+		if (previousPk) {
+			return this.orderDirection > 0 ? {items: items, after: previousPk} : {items: items, before: previousPk};
+		}
+	}
+
+	private enqueue(move: Move) {
+		// moves are relative to their neighbours, hence they are posted in the sequence of dragging
+		this.pendingMoves.push(move);
+		window.clearTimeout(this.pendingTimeout);
+		this.pendingTimeout = window.setTimeout(() => this.flush(), this.config.update_delay ?? 250);
+	}
+
+	private flush() {
+		window.clearTimeout(this.pendingTimeout);
+		if (this.pendingMoves.length === 0)
+			return;
+		const moves = this.pendingMoves, sequence = ++this.sequence;
+		this.pendingMoves = [];
+		// send one batch after another, so that they are applied in sequence
+		this.sending = this.sending.then(() => this.send(moves, sequence)).catch(error => console.error(error));
+	}
+
+	private async send(moves: Array<Move>, sequence: number) {
 		const response = await fetch(this.config.update_url, {
 			method: 'POST',
 			headers: this.headers,
-			body: JSON.stringify({
-				updatedItems: Array.from(updatedItems.entries()),
-			})
+			// the version is added when sending, since it is updated by the response to the previous batch
+			body: JSON.stringify({moves: moves, sequence: sequence, client: this.clientId, version: this.version}),
+			keepalive: true,
 		});
 		if (response.status === 200) {
+			this.applyOrders(await response.json());
 			this.resetActions();
+		} else if (response.status === 409) {
+			// this batch has been received before, or after a newer one, hence the shown positions are unknown
+			if (this.pendingMoves.length === 0) {
+				window.location.reload();
+			}
 		} else {
 			console.error(`The server responded: ${response.statusText}`);
 		}
 	}
 
+	private moveButtonClicked(target: EventTarget | null) {
+		if (!(target instanceof HTMLElement) || !target.matches('.sort i[position]'))
+			return;
+		const tableRow = target.closest('tr');
+		const pk = tableRow?.querySelector('.handle')?.getAttribute('pk');
+		if (!tableRow || !pk)
+			return;
+		const position = target.getAttribute('position');
+		// queue the move behind the dragged items, since they are applied before it on the server
+		this.flush();
+		this.sending = this.sending.then(() => this.sendMove(tableRow, pk, position)).catch(error => console.error(error));
+	}
+
+	private async sendMove(tableRow: HTMLTableRowElement, pk: string, position: string | null) {
+		const response = await fetch(this.config.move_url, {
+			method: 'POST',
+			headers: this.headers,
+			body: JSON.stringify({pk: pk, position: position, version: this.version}),
+		});
+		if (response.status !== 200) {
+			console.error(`The server responded: ${response.statusText}`);
+			return;
+		}
+		const data = await response.json();
+		this.applyOrders(data);
+		if (pk in data.orders) {
+			this.placeRow(tableRow, String(data.orders[pk]));
+		}
+	}
+
+	private placeRow(tableRow: HTMLTableRowElement, order: string) {
+		// insert the row before the first one following it in the shown direction, or remove it if its
+		// new position is on a page not shown
+		const rows = Array.from(this.tableBody.rows).filter(row => row !== tableRow);
+		const orders = rows.map(row => row.querySelector('.handle')?.getAttribute('order') ?? '');
+		if (rows.length === 0)
+			return;
+		const direction = rows.length > 1 && this.compareOrders(orders[0], orders[orders.length - 1]) > 0 ? -1 : 1;
+		const index = orders.findIndex(other => direction * this.compareOrders(other, order) > 0);
+		if ((index === 0 && this.moreBefore) || (index === -1 && this.moreAfter)) {
+			tableRow.remove();
+		} else if (index === -1) {
+			this.tableBody.append(tableRow);
+		} else {
+			rows[index].before(tableRow);
+		}
+	}
+
+	private compareOrders(a: string, b: string): number {
+		if (/^-?\d+$/.test(a) && /^-?\d+$/.test(b))
+			return parseInt(a) - parseInt(b);
+		return a < b ? -1 : a > b ? 1 : 0;
+	}
+
+	private applyOrders(data: {orders: {[pk: string]: number | string}, version: number | null, outdated: boolean}) {
+		// the server answers with the final positions of all items touched by this request
+		for (const [pk, order] of Object.entries(data.orders)) {
+			this.tableBody.querySelector(`.handle[pk="${CSS.escape(pk)}"]`)?.setAttribute('order', String(order));
+		}
+		this.version = data.version;
+		if (data.outdated && this.pendingMoves.length === 0) {
+			// someone else has changed this list in the meantime, hence the shown positions are outdated
+			window.location.reload();
+		}
+	}
+
 	private resetActions() {
 		// reset default action checkboxes behaviour
 		if (!window.hasOwnProperty('Actions'))
@@ -162,6 +386,7 @@ class ActionForm {
 	private readonly config: any;
 	private readonly stepInput: HTMLInputElement;
 	private readonly pageInput: HTMLInputElement;
+	private readonly positionInput: HTMLInputElement;
 
 	constructor(formElement: HTMLFormElement, selectElement: HTMLSelectElement, config: any) {
 		this.selectElement = selectElement;
@@ -178,10 +403,14 @@ class ActionForm {
 		this.pageInput.setAttribute('min', '1');
 		this.pageInput.setAttribute('max', `${this.config.total_pages}`);
 		this.pageInput.value = `${this.config.current_page}`;
+
+		this.positionInput = document.getElementById('changelist-form-position') as HTMLInputElement;
+		this.positionInput.setAttribute('min', '1');
+		this.positionInput.value = '1';
 	}
 
 	private actionChanged() {
-		this.pageInput.style.display = this.stepInput.style.display = 'none';
+		this.pageInput.style.display = this.stepInput.style.display = this.positionInput.style.display = 'none';
 		switch (this.selectElement?.value) {
 			case 'move_to_exact_page':
 				this.pageInput.style.display = 'inline-block';
@@ -195,6 +424,9 @@ class ActionForm {
 			case 'move_to_first_page':
 				this.pageInput.value = '1';
 				break;
+			case 'move_to_position':
+				this.positionInput.style.display = 'inline-block';
+				break;
 			case 'move_to_last_page':
 				this.pageInput.value = `${this.config.total_pages + 1}`;
 				break;
@@ -208,10 +440,12 @@ class ActionForm {
 class InlineSortable {
 	private readonly sortable: Sortable;
 	private readonly reversed: boolean;
+	private readonly lexicographic: boolean;
 	private readonly itemSelectors: string;
 
 	constructor(inlineFieldSet: HTMLFieldSetElement) {
 		this.reversed = inlineFieldSet.classList.contains('reversed');
+		this.lexicographic = inlineFieldSet.classList.contains('lexicographic');
 		const tBody = inlineFieldSet.querySelector('table tbody') as HTMLTableSectionElement;
 		if (tBody) {
 			// tabular inline
@@ -220,7 +454,7 @@ class InlineSortable {
 				animation: 150,
 				handle: 'td.original p',
 				draggable: 'tr',
-				onEnd: event => this.onEnd(),
+				onEnd: event => this.onEnd(event.oldDraggableIndex, event.newDraggableIndex),
 				onMove: event => this.onMove(event),
 			});
 		} else {
@@ -230,7 +464,7 @@ class InlineSortable {
 				animation: 150,
 				handle: 'h3',
 				draggable: '.inline-related.has_original',
-				onEnd: event => this.onEnd(),
+				onEnd: event => this.onEnd(event.oldDraggableIndex, event.newDraggableIndex),
 			});
 		}
 		inlineFieldSet.querySelectorAll('.inline-related .sort i.move-begin').forEach(
@@ -241,18 +475,50 @@ class InlineSortable {
 		);
 	}
 
-	private onEnd() {
-		const originals = this.sortable.el.querySelectorAll(this.itemSelectors);
-		if (this.reversed) {
-			originals.forEach((element: Element, index: number) => {
-				const reorderInputElement = element.querySelector('input._reorder_') as HTMLInputElement;
-				reorderInputElement.value = `${originals.length - index}`;
-			});
+	private onEnd(oldIndex?: number, newIndex?: number) {
+		const originals = Array.from(this.sortable.el.querySelectorAll(this.itemSelectors));
+		const inputElements = originals.map(element => element.querySelector('input._reorder_') as HTMLInputElement);
+		if (oldIndex === undefined || newIndex === undefined || !this.permuteRange(
+			inputElements.slice(Math.min(oldIndex, newIndex), Math.max(oldIndex, newIndex) + 1)
+		)) {
+			this.renumber(inputElements);
+		}
+	}
+
+	private permuteRange(inputElements: HTMLInputElement[]): boolean {
+		// only the items between the old and the new index changed their place, so just permute their
+		// values, leaving all other inputs untouched, so that they are not saved as changed
+		const values = inputElements.map(inputElement => inputElement.value);
+		if (new Set(values).size !== values.length)
+			return false;
+		if (this.lexicographic) {
+			if (values.some(value => !value))
+				return false;
+			values.sort();
 		} else {
-			originals.forEach((element: Element, index: number) => {
-				const reorderInputElement = element.querySelector('input._reorder_') as HTMLInputElement;
-				reorderInputElement.value = `${index + 1}`;
-			});
+			if (values.some(value => !(Number(value) > 0)))
+				return false;
+			values.sort((a, b) => Number(a) - Number(b));
+		}
+		if (this.reversed) {
+			values.reverse();
+		}
+		inputElements.forEach((inputElement, index) => this.setValue(inputElement, values[index]));
+		return true;
+	}
+
+	private renumber(inputElements: HTMLInputElement[]) {
+		// string keys are compared lexicographically, hence they must be of equal length
+		const width = this.lexicographic ? String(inputElements.length).length : 0;
+		inputElements.forEach((inputElement, index) => {
+			const order = this.reversed ? inputElements.length - index : index + 1;
+			this.setValue(inputElement, `${order}`.padStart(width, '0'));
+		});
+	}
+
+	private setValue(inputElement: HTMLInputElement, value: string) {
+		if (inputElement.value !== value) {
+			inputElement.value = value;
 		}
 	}
 
@@ -266,15 +532,17 @@ class InlineSortable {
 		const inlineRelated = target.closest(this.itemSelectors);
 		if (!inlineRelated)
 			return;
-		const inlineRelatedList = this.sortable.el.querySelectorAll(this.itemSelectors);
+		const inlineRelatedList = Array.from(this.sortable.el.querySelectorAll(this.itemSelectors));
 		if (inlineRelatedList.length < 2)
 			return;
+		const oldIndex = inlineRelatedList.indexOf(inlineRelated);
 		if (direction === 'begin') {
 			inlineRelatedList[0].insertAdjacentElement('beforebegin', inlineRelated);
+			this.onEnd(oldIndex, 0);
 		} else {
 			inlineRelatedList[inlineRelatedList.length - 1].insertAdjacentElement('afterend', inlineRelated);
+			this.onEnd(oldIndex, inlineRelatedList.length - 1);
 		}
-		this.onEnd();
 	}
 }
 
@@ -75,6 +75,10 @@ class UnsortedBookAdmin(SortableAdminBase, admin.ModelAdmin):
     inlines = [ChapterStackedInline]
 
 
+class LargeSortableBookAdmin(SortableBookAdmin):
+    list_per_page = 1000
+
+
 class ImportExportMixin:
     """
     Dummy mixin class to test if a proprietary change_list_template is properly overwritten.
@@ -139,3 +143,4 @@ admin.site.register(Book, DownOrderedSortableBookAdmin, name="Books (reverse ord
 admin.site.register(Book, SortableBookAdminTabular, name="Books (ordered by admin, tabular inlines)", infix=5)
 admin.site.register(Book, UnsortedBookAdmin, name="Unsorted Books (sorted stacked inlines)", infix=6)
 admin.site.register(Book, SortableAdminExtraMixin, name="Books (inheriting from external admin mixin)", infix=7)
+admin.site.register(Book1, LargeSortableBookAdmin, name="Books (a thousand per page)", infix=9)
@@ -6,8 +6,12 @@ os.environ.setdefault('DJANGO_ALLOW_ASYNC_UNSAFE', 'true')
 
 @pytest.fixture(scope='function')
 def django_db_setup(django_db_blocker):
+    from django.conf import settings
+    from django.core.cache import caches
     from django.core.management import call_command
 
+    # the versions of the sorted lists are kept in a file, which outlives the test database
+    caches[settings.ADMINSORTABLE2_CACHE].clear()
     with django_db_blocker.unblock():
         call_command('migrate', verbosity=0)
         call_command('loaddata', 'testapp/fixtures/data.json', verbosity=0)
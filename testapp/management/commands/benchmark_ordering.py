@@ -0,0 +1,216 @@
+import json
+import random
+from io import StringIO
+from pathlib import Path
+
+from django import VERSION as DJANGO_VERSION
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+
+from adminsortable2.admin import SortableAdminMixin
+from adminsortable2.instrumentation import count_rows, measure
+from adminsortable2.ordering import SparseOrdering
+
+from testapp.admin import ChapterTabularInline
+from testapp.models import Book, Book1, Chapter
+
+
+class DenseBookAdmin(SortableAdminMixin, admin.ModelAdmin):
+    pass
+
+
+class SparseBookAdmin(SortableAdminMixin, admin.ModelAdmin):
+    order_strategy = SparseOrdering(gap=1024)
+
+
+class BulkChapterInline(ChapterTabularInline):
+    bulk_create_new_items = True
+
+
+class Rollback(Exception):
+    """
+    Raised to discard the rows generated for one size of the benchmark.
+    """
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure how ordering operations scale, by generating large lists of books and chapters in a "
+        "transaction, which is rolled back afterwards. For each operation the wall time, the number of "
+        "queries and the number of written rows are reported."
+    )
+    generate_batch_size = 10000
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            action='append',
+            help="Number of generated books, repeat for several sizes (default: 10000, 100000 and 1000000)",
+        )
+        parser.add_argument(
+            '--selected',
+            type=int,
+            default=100,
+            help="Number of books moved to the first page at once",
+        )
+        parser.add_argument(
+            '--chapters',
+            type=int,
+            default=1000,
+            help="Number of chapters of the book edited through its inline",
+        )
+        parser.add_argument(
+            '--new-chapters',
+            type=int,
+            default=50,
+            help="Number of chapters added through the inline in one save",
+        )
+        parser.add_argument(
+            '--send-move-signals',
+            action='store_true',
+            help="Send pre_save and post_save for each shifted item, which loads all of them",
+        )
+        parser.add_argument(
+            '--output',
+            type=Path,
+            help="Write the results to this JSON file",
+        )
+        parser.add_argument(
+            '--compare',
+            type=Path,
+            help="Compare the results with those of a JSON file written by a previous run",
+        )
+
+    def handle(self, *args, **options):
+        sizes = options['rows'] or [10000, 100000, 1000000]
+        if min(sizes) < 2 or options['selected'] < 1 or options['new_chapters'] < 1:
+            raise CommandError("The number of rows, selected items and new chapters must be positive")
+        if options['selected'] >= min(sizes):
+            raise CommandError("The number of selected items must be smaller than the number of rows")
+        DenseBookAdmin.send_move_signals = SparseBookAdmin.send_move_signals = options['send_move_signals']
+
+        report = {
+            'database': connection.vendor,
+            'django': '.'.join(str(part) for part in DJANGO_VERSION[:3]),
+            'send_move_signals': options['send_move_signals'],
+            'results': {},
+        }
+        for rows in sizes:
+            report['results'][str(rows)] = self.run_suite(rows, options)
+
+        if options['output']:
+            options['output'].write_text(json.dumps(report, indent=2))
+            self.stdout.write(f"Results written to {options['output']}")
+        if options['compare']:
+            self.compare(report, json.loads(options['compare'].read_text()))
+
+    def run_suite(self, rows, options):
+        self.results = {}
+        try:
+            with transaction.atomic():
+                self.generate(rows, options['chapters'])
+                self.run_list_operations(rows, options['selected'])
+                self.run_inline_operations(options['new_chapters'])
+                raise Rollback
+        except Rollback:
+            pass
+        return self.results
+
+    def generate(self, rows, num_chapters):
+        Book.objects.all().delete()
+        for start in range(0, rows, self.generate_batch_size):
+            stop = min(start + self.generate_batch_size, rows)
+            Book.objects.bulk_create(
+                Book(title=f"Book {order}", my_order=order) for order in range(start + 1, stop + 1)
+            )
+        book = Book.objects.get(my_order=1)
+        Chapter.objects.bulk_create(
+            Chapter(book=book, title=f"Chapter {order}", my_order=order) for order in range(1, num_chapters + 1)
+        )
+
+    def run_list_operations(self, rows, num_selected):
+        request = RequestFactory().post('/')
+        dense_admin = DenseBookAdmin(Book1, admin.site)
+        sparse_admin = SparseBookAdmin(Book1, admin.site)
+        last_pk = Book.objects.get(my_order=rows).pk
+        self.measure(rows, 'drag_to_top', dense_admin._move_item, rows, 1, {})
+        self.measure(rows, 'drag_to_bottom', dense_admin._move_item, 1, rows, {})
+        self.measure(rows, 'move_to_position', dense_admin._move_to_position, request, last_pk, rows // 2)
+        pks = random.Random(rows).sample(list(Book.objects.values_list('pk', flat=True)), num_selected)
+        queryset = Book1.objects.filter(pk__in=pks)
+        self.measure(rows, 'bulk_move', dense_admin._move_items_to_position, request, queryset, 0, 'my_order')
+        self.measure(rows, 'reorder_sparse', call_command, 'reorder', 'testapp.Book1', gap=1024, stdout=StringIO())
+        self.measure(rows, 'sparse_drag_to_top', sparse_admin._move_item, rows * 1024, 1024, {})
+        self.measure(rows, 'sparse_bulk_move', sparse_admin._move_items_to_position, request, queryset, 0, 'my_order')
+        self.measure(rows, 'reorder', call_command, 'reorder', 'testapp.Book1', stdout=StringIO())
+
+    def run_inline_operations(self, num_new_chapters):
+        request = RequestFactory().post('/')
+        request.user = User(username='benchmark', is_active=True, is_superuser=True)
+        book = Book.objects.get(my_order=1)
+        for name, inline_class in [('inline_save', ChapterTabularInline), ('inline_bulk_save', BulkChapterInline)]:
+            inline = inline_class(Book, admin.site)
+            FormSet = inline.get_formset(request, book)
+            formset = FormSet(
+                data=self.get_chapter_form_data(book, num_new_chapters),
+                instance=book,
+                prefix='chapter_set',
+                default_order_direction=inline.default_order_direction,
+                default_order_field=inline.default_order_field,
+                bulk_create_new_items=inline.bulk_create_new_items,
+            )
+            if not formset.is_valid():
+                raise CommandError(f"Invalid chapters: {formset.errors}")
+            self.measure(Book.objects.count(), name, self.save_formset, formset)
+
+    def save_formset(self, formset):
+        # inserted rows are not counted by the ordering operations
+        count_rows(shifted=len(formset.save()))
+
+    def get_chapter_form_data(self, book, num_chapters, prefix='chapter_set'):
+        form_data = {
+            f'{prefix}-TOTAL_FORMS': num_chapters,
+            f'{prefix}-INITIAL_FORMS': 0,
+            f'{prefix}-MIN_NUM_FORMS': 0,
+            f'{prefix}-MAX_NUM_FORMS': num_chapters,
+        }
+        for index in range(num_chapters):
+            form_data.update({
+                f'{prefix}-{index}-title': f"New chapter {index}",
+                f'{prefix}-{index}-my_order': "",
+                f'{prefix}-{index}-id': "",
+                f'{prefix}-{index}-book': book.id,
+            })
+        return form_data
+
+    def measure(self, rows, name, func, *args, **kwargs):
+        with measure(f'benchmark.{name}', Book1) as measurement:
+            func(*args, **kwargs)
+        self.results[name] = {
+            'duration': measurement.duration,
+            'queries': measurement.queries,
+            'rows_written': measurement.rows_shifted,
+            'rows_locked': measurement.rows_locked,
+        }
+        self.stdout.write(
+            f"{rows:>9} rows  {name:<20} {measurement.duration * 1000:10.1f} ms {measurement.queries:6} queries "
+            f"{measurement.rows_shifted:9} rows written"
+        )
+
+    def compare(self, report, baseline):
+        for rows, results in report['results'].items():
+            for name, result in results.items():
+                previous = baseline.get('results', {}).get(rows, {}).get(name)
+                if previous is None:
+                    continue
+                ratio = result['duration'] / previous['duration'] if previous['duration'] else float('inf')
+                self.stdout.write(
+                    f"{rows:>9} rows  {name:<20} {ratio:6.2f}x time, "
+                    f"{result['queries'] - previous['queries']:+d} queries, "
+                    f"{result['rows_written'] - previous['rows_written']:+d} rows written"
+                )
@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Note',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.CharField(blank=True, max_length=255, null=True, verbose_name='Text')),
+                ('my_order', models.CharField(blank=True, db_index=True, max_length=255)),
+            ],
+            options={
+                'ordering': ['my_order'],
+            },
+        ),
+    ]
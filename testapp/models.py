@@ -114,3 +114,23 @@ class Chapter2(Chapter):
         proxy = True
         ordering = ['-my_order']
         verbose_name = "Chapter"
+
+
+class Note(models.Model):
+    text = models.CharField(
+        "Text",
+        null=True,
+        blank=True,
+        max_length=255,
+    )
+    my_order = models.CharField(
+        max_length=255,
+        blank=True,
+        db_index=True,
+    )
+
+    class Meta:
+        ordering = ['my_order']
+
+    def __str__(self):
+        return self.text
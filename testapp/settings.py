@@ -32,6 +32,19 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'sortable': {
+        # shared by all processes, such as the live server of the end-to-end tests
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': Path(__file__).parent.parent / 'workdir/cache',
+    },
+}
+
+ADMINSORTABLE2_CACHE = 'sortable'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 USE_TZ = False
@@ -1,9 +1,12 @@
 import pytest
 
+from django.contrib import admin
 from django.test import Client
 from django.urls import reverse
 
-from testapp.models import Book1
+from adminsortable2.admin import CustomInlineFormSet
+from testapp.admin import ChapterTabularInline
+from testapp.models import Book, Book1, Chapter
 
 alex_martelli_id = 24
 
@@ -58,3 +61,102 @@ def test_add_chapter():
     assert python_in_a_nutshell.chapter_set.count() == 2
     assert python_in_a_nutshell.chapter_set.first().my_order == 1
     assert python_in_a_nutshell.chapter_set.last().my_order == 2
+
+
+def chapter_form_data(book, titles, prefix='chapter_set'):
+    form_data = {
+        f'{prefix}-TOTAL_FORMS': len(titles),
+        f'{prefix}-INITIAL_FORMS': 0,
+        f'{prefix}-MIN_NUM_FORMS': 0,
+        f'{prefix}-MAX_NUM_FORMS': 1000,
+    }
+    for index, title in enumerate(titles):
+        form_data.update({
+            f'{prefix}-{index}-title': title,
+            f'{prefix}-{index}-my_order': "",
+            f'{prefix}-{index}-id': "",
+            f'{prefix}-{index}-book': book.id,
+        })
+    return form_data
+
+
+@pytest.mark.django_db
+def test_add_chapters_with_one_max_order_query(mocker):
+    django_for_apis = Book1.objects.get(title="Django for APIs")
+    num_chapters = django_for_apis.chapter_set.count()
+    get_max_order = mocker.spy(CustomInlineFormSet, 'get_max_order')
+    form_data = {
+        'title': django_for_apis.title,
+        'author': django_for_apis.author_id,
+        '_save': "Save",
+        **chapter_form_data(django_for_apis, ["Testing", "Caching", "Deployment"]),
+    }
+    client = Client()
+    response = client.post(reverse('admin:testapp_book3_change', args=(django_for_apis.id,)), form_data)
+    assert response.status_code == 302, "Unable to add chapters"
+    assert get_max_order.call_count == 1
+    assert list(django_for_apis.chapter_set.order_by('my_order').values_list('title', 'my_order')[num_chapters:]) == [
+        ("Testing", num_chapters + 1), ("Caching", num_chapters + 2), ("Deployment", num_chapters + 3),
+    ]
+
+
+class BulkChapterInline(ChapterTabularInline):
+    bulk_create_new_items = True
+
+
+@pytest.mark.django_db
+def test_bulk_create_chapters(rf, admin_user, django_assert_num_queries):
+    book = Book.objects.get(title="Django for APIs")
+    num_chapters = book.chapter_set.count()
+    inline = BulkChapterInline(Book, admin.site)
+    request = rf.post('/')
+    request.user = admin_user
+    FormSet = inline.get_formset(request, book)
+    formset = FormSet(
+        data=chapter_form_data(book, ["Testing", "Caching"]),
+        instance=book,
+        prefix='chapter_set',
+        default_order_direction=inline.default_order_direction,
+        default_order_field=inline.default_order_field,
+        bulk_create_new_items=inline.bulk_create_new_items,
+    )
+    assert formset.is_valid(), formset.errors
+    with django_assert_num_queries(2):
+        formset.save()
+    assert list(book.chapter_set.order_by('my_order').values_list('title', 'my_order')[num_chapters:]) == [
+        ("Testing", num_chapters + 1), ("Caching", num_chapters + 2),
+    ]
+
+
+@pytest.mark.django_db
+def test_reorder_chapters_without_saving_them(mocker):
+    django_for_apis = Book.objects.get(title="Django for APIs")
+    chapters = list(django_for_apis.chapter_set.order_by('my_order'))
+    form_data = {
+        'title': django_for_apis.title,
+        'author': django_for_apis.author_id,
+        '_save': "Save",
+        'chapter_set-TOTAL_FORMS': len(chapters),
+        'chapter_set-INITIAL_FORMS': len(chapters),
+        'chapter_set-MIN_NUM_FORMS': 0,
+        'chapter_set-MAX_NUM_FORMS': 1000,
+    }
+    for index, chapter in enumerate(chapters):
+        form_data.update({
+            f'chapter_set-{index}-title': chapter.title,
+            f'chapter_set-{index}-my_order': chapter.my_order,
+            f'chapter_set-{index}-id': chapter.id,
+            f'chapter_set-{index}-book': django_for_apis.id,
+        })
+    # swap the first two chapters and rename the last one
+    form_data['chapter_set-0-my_order'], form_data['chapter_set-1-my_order'] = 2, 1
+    form_data[f'chapter_set-{len(chapters) - 1}-title'] = "Schemas"
+    save = mocker.spy(Chapter, 'save')
+    client = Client()
+    response = client.post(reverse('admin:testapp_book3_change', args=(django_for_apis.id,)), form_data)
+    assert response.status_code == 302, "Unable to reorder chapters"
+    assert [call.args[0].pk for call in save.call_args_list] == [chapters[-1].pk]
+    assert list(django_for_apis.chapter_set.order_by('my_order').values_list('pk', flat=True)) == [
+        chapters[1].pk, chapters[0].pk, *[chapter.pk for chapter in chapters[2:]],
+    ]
+    assert django_for_apis.chapter_set.get(pk=chapters[-1].pk).title == "Schemas"
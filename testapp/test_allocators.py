@@ -0,0 +1,170 @@
+import pytest
+
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Max
+
+from adminsortable2.admin import SortableAdminBase, SortableAdminMixin, SortableInlineAdminMixin
+from adminsortable2.allocators import CacheOrderAllocator, MaxOrderAllocator
+from adminsortable2.ordering import DenseOrdering, LexicographicOrdering, SparseOrdering
+
+from testapp.models import Author, Book, Book1, Chapter1
+
+
+class CachedBookAdmin(SortableAdminMixin, admin.ModelAdmin):
+    order_allocator = CacheOrderAllocator()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+class MaxOrder:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_max_order_allocator():
+    get_max_order = MaxOrder(7)
+    assert MaxOrderAllocator().allocate(DenseOrdering(), get_max_order, 'key', count=3) == [8, 9, 10]
+    assert MaxOrderAllocator().allocate(DenseOrdering(), get_max_order, 'key') == [8]
+    assert get_max_order.calls == 2
+
+
+def test_cache_allocator_seeds_once():
+    allocator = CacheOrderAllocator()
+    get_max_order = MaxOrder(7)
+    assert allocator.allocate(DenseOrdering(), get_max_order, 'key') == [8]
+    assert allocator.allocate(DenseOrdering(), get_max_order, 'key', count=3) == [9, 10, 11]
+    assert allocator.allocate(DenseOrdering(), get_max_order, 'other') == [8]
+    assert get_max_order.calls == 2
+    allocator.reset('key')
+    assert allocator.allocate(DenseOrdering(), get_max_order, 'key') == [8]
+    assert get_max_order.calls == 3
+
+
+def test_cache_allocator_with_gap():
+    allocator = CacheOrderAllocator()
+    get_max_order = MaxOrder(2048)
+    assert allocator.allocate(SparseOrdering(1024), get_max_order, 'key', count=2) == [3072, 4096]
+    assert allocator.allocate(SparseOrdering(1024), get_max_order, 'key') == [5120]
+
+
+def test_cache_allocator_delegates_string_keys():
+    allocator = CacheOrderAllocator()
+    get_max_order = MaxOrder('1')
+    strategy = LexicographicOrdering()
+    assert allocator.allocate(strategy, get_max_order, 'key') == [strategy.after('1')]
+    assert allocator.allocate(strategy, get_max_order, 'key') == [strategy.after('1')]
+    assert get_max_order.calls == 2
+
+
+@pytest.mark.django_db
+def test_save_model_without_aggregating(rf, django_assert_num_queries):
+    model_admin = CachedBookAdmin(Book1, admin.site)
+    request = rf.post('/')
+    author = Author.objects.first()
+    num_books = Book1.objects.count()
+    book = Book1(title="Python Cookbook", author=author)
+    with django_assert_num_queries(2):
+        model_admin.save_model(request, book, None, False)
+    assert book.my_order == num_books + 1
+    book = Book1(title="Python Tricks", author=author)
+    with django_assert_num_queries(1):
+        model_admin.save_model(request, book, None, False)
+    assert book.my_order == num_books + 2
+
+
+class SparseCachedBookAdmin(SortableAdminMixin, admin.ModelAdmin):
+    order_strategy = SparseOrdering(1024)
+    order_allocator = CacheOrderAllocator()
+
+
+@pytest.mark.django_db
+def test_move_to_bottom_advances_cached_counter(rf):
+    model_admin = SparseCachedBookAdmin(Book1, admin.site)
+    request = rf.post('/')
+    author = Author.objects.first()
+    last_book = Book1(title="Python Cookbook", author=author)
+    model_admin.save_model(request, last_book, None, False)
+    book = Book1.objects.order_by('my_order').first()
+    model_admin._move_to_position(request, book.pk, None)
+    book.refresh_from_db()
+    assert book.my_order > last_book.my_order
+    new_book = Book1(title="Python Tricks", author=author)
+    model_admin.save_model(request, new_book, None, False)
+    assert new_book.my_order > book.my_order
+
+
+# the management commands reset the allocators of all sortable admin classes registered for a model
+class CachedChapterInline(SortableInlineAdminMixin, admin.TabularInline):
+    model = Chapter1
+    order_allocator = CacheOrderAllocator()
+
+
+class BookWithChaptersAdmin(SortableAdminBase, admin.ModelAdmin):
+    inlines = [CachedChapterInline]
+
+
+allocators_site = admin.AdminSite(name='allocators')
+allocators_site.register(Book1, CachedBookAdmin)
+allocators_site.register(Book, BookWithChaptersAdmin)
+
+
+def is_last(book):
+    others = Book1.objects.exclude(pk=book.pk).aggregate(max_order=Max('my_order'))['max_order']
+    return book.my_order > others
+
+
+@pytest.mark.django_db
+def test_reorder_resets_cached_counter(rf):
+    model_admin = allocators_site._registry[Book1]
+    request = rf.post('/')
+    author = Author.objects.first()
+    model_admin.save_model(request, Book1(title="Python Cookbook", author=author), None, False)
+    call_command('reorder', 'testapp.Book1', gap=1024, verbosity=0)
+    book = Book1(title="Python Tricks", author=author)
+    model_admin.save_model(request, book, None, False)
+    assert is_last(book)
+
+
+@pytest.mark.django_db
+def test_repair_resets_cached_counter(rf, capsys):
+    model_admin = allocators_site._registry[Book1]
+    request = rf.post('/')
+    author = Author.objects.first()
+    model_admin.save_model(request, Book1(title="Python Cookbook", author=author), None, False)
+    # added while bypassing the admin, hence it duplicates a position
+    Book1.objects.create(title="Fluent Python", author=author, my_order=5)
+    call_command('checkorder', 'testapp.Book1', repair=True)
+    book = Book1(title="Python Tricks", author=author)
+    model_admin.save_model(request, book, None, False)
+    assert is_last(book)
+
+
+@pytest.mark.django_db
+def test_reorder_resets_cached_counters_of_inlines(rf, admin_user):
+    request = rf.get('/')
+    request.user = admin_user
+    book = Book.objects.filter(chapter__isnull=False).first()
+    inline = CachedChapterInline(Book, allocators_site)
+    FormSet = inline.get_formset(request, book)
+    formset = FormSet(
+        instance=book,
+        default_order_field=inline.default_order_field,
+        order_allocator=inline.order_allocator,
+    )
+    key = formset.get_order_allocation_key()
+    inline.order_allocator.allocate(inline.order_strategy, formset.get_max_order, key)
+    assert cache.get(inline.order_allocator.get_cache_key(key)) is not None
+    call_command('reorder', 'testapp.Chapter1', gap=1024, verbosity=0)
+    assert cache.get(inline.order_allocator.get_cache_key(key)) is None
@@ -0,0 +1,82 @@
+import pytest
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from testapp.models import Book
+
+
+def ordered_pks(descending=False):
+    return list(Book.objects.order_by('-my_order' if descending else 'my_order').values_list('pk', flat=True))
+
+
+def post_action(slug, action, selected, page=None, **data):
+    url = reverse(f'admin:testapp_{slug}_changelist')
+    if page:
+        url = f'{url}?p={page}'
+    data.update(action=action, _selected_action=selected, index=0)
+    return Client().post(url, data)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('slug, descending', [('book0', False), ('book2', True)])
+def test_move_to_forward_page(slug, descending):
+    pks = ordered_pks(descending)
+    selected = [pks[1], pks[3], pks[5]]
+    response = post_action(slug, 'move_to_forward_page', selected, step=2)
+    assert response.status_code == 302
+    remaining = [pk for pk in pks if pk not in selected]
+    assert ordered_pks(descending) == remaining[:24] + selected + remaining[24:]
+
+
+@pytest.mark.django_db
+def test_move_to_first_page():
+    pks = ordered_pks()
+    selected = [pks[30], pks[12], pks[40]]
+    response = post_action('book0', 'move_to_first_page', selected, page=3)
+    assert response.status_code == 302
+    selected.sort(key=pks.index)
+    remaining = [pk for pk in pks if pk not in selected]
+    assert ordered_pks() == selected + remaining
+    assert sorted(Book.objects.values_list('my_order', flat=True)) == list(range(1, len(pks) + 1))
+
+
+@pytest.mark.django_db
+def test_move_to_last_page():
+    pks = ordered_pks()
+    selected = pks[:8]
+    response = post_action('book0', 'move_to_last_page', selected)
+    assert response.status_code == 302
+    remaining = [pk for pk in pks if pk not in selected]
+    assert ordered_pks() == remaining + selected
+
+
+def count_queries(slug, query_string=''):
+    with CaptureQueriesContext(connection) as context:
+        response = Client().get(reverse(f'admin:testapp_{slug}_changelist') + query_string)
+    assert response.status_code == 200
+    return response, [query['sql'] for query in context.captured_queries if 'COUNT(' in query['sql']]
+
+
+@pytest.mark.django_db
+def test_move_actions_reuse_changelist_paginator():
+    response, sortable_counts = count_queries('book0', '?p=2')
+    _, plain_counts = count_queries('book6', '?p=2')
+    assert len(sortable_counts) == len(plain_counts)
+    for action in ['move_to_first_page', 'move_to_forward_page', 'move_to_last_page']:
+        assert f'value="{action}"'.encode() in response.content
+    response, _ = count_queries('book0', '?all=')
+    assert b'value="move_to_last_page"' not in response.content
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('slug, descending', [('book0', False), ('book2', True)])
+def test_move_to_position(slug, descending):
+    pks = ordered_pks(descending)
+    selected = [pks[2], pks[30]]
+    response = post_action(slug, 'move_to_position', selected, position=20)
+    assert response.status_code == 302
+    remaining = [pk for pk in pks if pk not in selected]
+    assert ordered_pks(descending) == remaining[:19] + selected + remaining[19:]
@@ -0,0 +1,104 @@
+import pytest
+
+from django.contrib import admin
+from django.test import Client
+from django.urls import reverse
+
+from adminsortable2.admin import SortableAdminMixin
+
+from testapp.models import Book1
+
+
+@pytest.mark.django_db
+def test_drag_handles_depend_on_ordering():
+    url = reverse('admin:testapp_book0_changelist')
+    response = Client().get(url)
+    assert b'class="sortable column-_reorder_' in response.content
+    assert response.content.count(b'class="drag handle"') == 12
+    response = Client().get(f'{url}?o=1')
+    assert b'class="drag handle"' not in response.content
+    assert response.content.count(b'class="drag"') == 12
+
+
+@pytest.mark.django_db
+def test_sorting_state_is_request_scoped(rf, admin_user):
+    model_admin = next(
+        model_admin for model, model_admin in admin.site._registry.items() if model._meta.model_name == 'book0'
+    )
+    by_title, by_order = rf.get('/', {'o': '1'}), rf.get('/')
+    by_title.user = by_order.user = admin_user
+    cl_by_title = model_admin.get_changelist_instance(by_title)
+    cl_by_order = model_admin.get_changelist_instance(by_order)
+    assert model_admin._get_sortable_order_by(by_title) is None
+    assert model_admin._get_sortable_order_by(by_order) == 'my_order'
+    book = Book1.objects.first()
+    reorder_by_title = cl_by_title.list_display[-1]
+    reorder_by_order = cl_by_order.list_display[-1]
+    assert reorder_by_title.__name__ == reorder_by_order.__name__ == '_reorder_'
+    assert 'handle' not in reorder_by_title(book)
+    assert f'pk="{book.pk}"' in reorder_by_order(book)
+    assert 'move_to_last_page' not in model_admin.get_actions(by_title)
+    assert 'move_to_last_page' in model_admin.get_actions(by_order)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('query_string, positions', [
+    ('', ('top', 'bottom')),
+    ('?o=-3', ('bottom', 'top')),
+])
+def test_move_buttons_follow_shown_ordering(query_string, positions):
+    response = Client().get(reverse('admin:testapp_book0_changelist') + query_string)
+    content = response.content.decode()
+    assert content.count(f'<i class="move-begin" position="{positions[0]}"') == 12
+    assert content.count(f'<i class="move-end" position="{positions[1]}"') == 12
+    assert '"move_url": "/admin/testapp/book0/adminsortable2_move/"' in content
+    response = Client().get(reverse('admin:testapp_book0_changelist') + '?o=1')
+    assert b'class="move-begin"' not in response.content
+
+
+@pytest.mark.django_db
+def test_deprecated_sorting_state(monkeypatch):
+    model_admin = next(
+        model_admin for model, model_admin in admin.site._registry.items() if model._meta.model_name == 'book0'
+    )
+    get_changelist_instance = model_admin.get_changelist_instance
+    seen = []
+
+    def legacy_get_changelist_instance(request):
+        # as overridden by projects written against the attributes of the admin instance
+        cl = get_changelist_instance(request)
+        seen.append((model_admin.enable_sorting, model_admin.order_by))
+        model_admin.enable_sorting = False
+        return cl
+
+    monkeypatch.setattr(model_admin, 'get_changelist_instance', legacy_get_changelist_instance)
+    with pytest.warns(DeprecationWarning, match='is deprecated, since the sorting state belongs to each request'):
+        response = Client().get(reverse('admin:testapp_book0_changelist'))
+    assert seen == [(True, 'my_order')]
+    assert b'class="drag handle"' not in response.content
+
+    # once rendered, the changelist of that request is no longer referred to
+    book = Book1.objects.first()
+    with pytest.warns(DeprecationWarning, match='enable_sorting'):
+        assert model_admin.enable_sorting is False
+    with pytest.warns(DeprecationWarning, match='order_by'):
+        assert model_admin.order_by is None
+    with pytest.warns(DeprecationWarning, match='_reorder_'):
+        assert 'handle' not in model_admin._reorder_(book)
+
+
+class ReorderColumnBookAdmin(SortableAdminMixin, admin.ModelAdmin):
+    list_display = ['title', '_reorder_', 'author']
+
+
+@pytest.mark.django_db
+def test_deprecated_reorder_column_in_list_display(rf, admin_user):
+    model_admin = ReorderColumnBookAdmin(Book1, admin.site)
+    assert model_admin.check() == []
+    request = rf.get('/')
+    request.user = admin_user
+    with pytest.warns(DeprecationWarning, match="'_reorder_' in `list_display`"):
+        list_display = model_admin.get_list_display(request)
+    assert list_display[0] == 'title'
+    assert list_display[1].__name__ == '_reorder_'
+    assert list_display[2:] == ['author']
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from django.core.management import call_command
+from django.db.models import F
+
+from adminsortable2.consistency import find_defects, repair_defects
+from adminsortable2.ordering import DenseOrdering
+from testapp.models import Book1, Chapter1
+
+
+def check_order(capsys, *args, **kwargs):
+    call_command('checkorder', *args, **kwargs)
+    return json.loads(capsys.readouterr().out)
+
+
+def chapter_orders():
+    orders = {}
+    for book_id, my_order in Chapter1.objects.order_by('book', 'my_order', 'pk').values_list('book', 'my_order'):
+        orders.setdefault(book_id, []).append(my_order)
+    return orders
+
+
+@pytest.mark.django_db
+def test_checkorder_without_defects(capsys):
+    report, = check_order(capsys, 'testapp.Chapter1')
+    assert report['partition_by'] == ['book']
+    assert report['defects'] == []
+
+
+@pytest.mark.django_db
+def test_checkorder_reports_defects(capsys):
+    Chapter1.objects.filter(book_id=36, my_order=3).update(my_order=2)
+    Chapter1.objects.filter(book_id=35, my_order__gte=5).update(my_order=F('my_order') + 10)
+    Chapter1.objects.filter(book_id=37, my_order=7).update(my_order=20)
+    report, = check_order(capsys, 'testapp.Chapter1')
+    defects = {defect['partition']['book']: defect for defect in report['defects']}
+    assert list(defects) == [35, 36, 37]
+    assert defects[35]['gaps'] == [[4, 15]]
+    assert defects[36]['duplicates'] == [2]
+    assert defects[36]['gaps'] == [[2, 4]]
+    assert defects[37]['duplicates'] == []
+    assert defects[37]['gaps'] == [[6, 8], [9, 20]]
+
+
+@pytest.mark.django_db
+def test_checkorder_repairs_affected_rows_only(capsys):
+    Chapter1.objects.filter(book_id=35, my_order__gte=10).update(my_order=F('my_order') + 10)
+    Chapter1.objects.filter(book_id=36, my_order=17).update(my_order=30)
+    untouched = dict(Chapter1.objects.filter(book_id=35, my_order__lt=10).values_list('pk', 'my_order'))
+    report, = check_order(capsys, 'testapp.Chapter1', repair=True)
+    assert report['repaired_rows'] == 7 + 1
+    for orders in chapter_orders().values():
+        assert orders == list(range(1, len(orders) + 1))
+    assert dict(Chapter1.objects.filter(pk__in=untouched).values_list('pk', 'my_order')) == untouched
+    report, = check_order(capsys, 'testapp.Chapter1')
+    assert report['defects'] == []
+
+
+@pytest.mark.django_db
+def test_repair_defects_without_partition():
+    pks = list(Book1.objects.order_by('my_order').values_list('pk', flat=True))
+    Book1.objects.filter(pk=pks[20]).update(my_order=20)
+    strategy = DenseOrdering()
+    defects = find_defects(Book1.objects.all(), 'my_order', strategy)
+    assert defects == [{'partition': {}, 'duplicates': [20], 'gaps': [[20, 22]], 'nulls': 0, 'max_position': None}]
+    assert repair_defects(Book1.objects.all(), 'my_order', strategy, defects) == 1
+    assert list(Book1.objects.order_by('my_order').values_list('my_order', flat=True)) == list(range(1, 43))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('defective_orders', [[0, 0], [0], [0, 1], [0, 2]])
+def test_checkorder_repairs_rows_at_zero(capsys, defective_orders):
+    Book1.objects.exclude(my_order__in=[1, 2, 3]).delete()
+    for order in defective_orders:
+        Book1.objects.create(title=f"Book {order}", my_order=order)
+    pks = list(Book1.objects.order_by('my_order', 'pk').values_list('pk', flat=True))
+    report, = check_order(capsys, 'testapp.Book1', repair=True)
+    assert report['defects'] != []
+    assert list(Book1.objects.order_by('my_order').values_list('pk', 'my_order')) == [
+        (pk, order) for order, pk in enumerate(pks, 1)
+    ]
+    report, = check_order(capsys, 'testapp.Book1')
+    assert report['defects'] == []
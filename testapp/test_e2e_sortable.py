@@ -1,5 +1,5 @@
 import pytest
-from time import sleep
+from time import perf_counter, sleep
 
 from django.urls import resolve
 
@@ -65,6 +65,11 @@ def update_url(live_server, slug):
     return f'{live_server.url}/admin/testapp/{slug}/adminsortable2_update/'
 
 
+@pytest.fixture
+def move_url(live_server, slug):
+    return f'{live_server.url}/admin/testapp/{slug}/adminsortable2_move/'
+
+
 @pytest.fixture
 def adminpage(page, page_url):
     page.goto(page_url)
@@ -186,6 +191,33 @@ def test_drag_multiple(adminpage, slug, p, o, direction, update_url):
         assert order == Book.objects.get(pk=pk).my_order
 
 
+@pytest.mark.parametrize('slug, p, o', [
+    ('book1', None, None),
+    ('book1', None, -3),
+    ('book2', None, None),
+])
+def test_move_buttons(adminpage, slug, p, o, direction, move_url):
+    table_locator = adminpage.locator('table#result_list')
+    drag_handle = table_locator.locator('tbody tr:nth-child(5) div.drag.handle')
+    drag_row_pk = drag_handle.get_attribute('pk')
+    with adminpage.expect_response(move_url) as response_info:
+        table_locator.locator('tbody tr:nth-child(5) i.move-begin').click()
+    while not (response := response_info.value):
+        sleep(0.1)
+    assert response.ok
+    assert is_table_ordered(table_locator.element_handle(), page=p, direction=direction)
+    assert drag_row_pk == table_locator.locator('tbody tr:first-child div.drag.handle').get_attribute('pk')
+    with adminpage.expect_response(move_url) as response_info:
+        table_locator.locator('tbody tr:first-child i.move-end').click()
+    while not (response := response_info.value):
+        sleep(0.1)
+    assert response.ok
+    # the last position of the list is on another page
+    assert table_locator.locator(f'tbody div.drag.handle[pk="{drag_row_pk}"]').count() == 0
+    last_order = Book.objects.count() if direction > 0 else 1
+    assert Book.objects.get(pk=drag_row_pk).my_order == last_order
+
+
 @pytest.mark.parametrize('slug, p, o', [
     ('book1', None, None),
     ('book2', None, -3),
@@ -251,3 +283,53 @@ def test_drag_then_delete(adminpage, slug, p, o, direction, update_url):
     assert f'<a href="{change_url}">{book.title}</a>' in html_response
     for chapter in book.chapter_set.all():
         assert f'<li>Chapter: {chapter}</li>' in html_response
+
+
+# counts the observers attached to the changelist and measures the time spent in all load handlers
+init_timing_script = """
+window.observedNodes = 0;
+const observe = MutationObserver.prototype.observe;
+MutationObserver.prototype.observe = function(target, options) {
+    if (target.closest && target.closest('#result_list')) {
+        window.observedNodes++;
+    }
+    return observe.call(this, target, options);
+};
+window.addEventListener('load', () => {
+    const start = performance.now();
+    setTimeout(() => window.initDuration = performance.now() - start);
+});
+"""
+
+
+@pytest.fixture
+def thousand_books():
+    num_books = Book.objects.count()
+    Book.objects.bulk_create(Book(title=f"Book {order}", my_order=order) for order in range(num_books + 1, 1001))
+    yield
+    Book.objects.filter(my_order__gt=num_books).delete()
+
+
+def test_large_changelist(thousand_books, page, live_server, record_property):
+    page.add_init_script(init_timing_script)
+    page.goto(f'{live_server.url}/admin/testapp/book9/')
+    page.wait_for_function('window.initDuration !== undefined')
+    table_locator = page.locator('table#result_list')
+    assert table_locator.locator('tbody tr').count() == 1000
+    assert page.evaluate('window.observedNodes') == 1
+    init_duration = page.evaluate('window.initDuration')
+    record_property('init_duration_ms', init_duration)
+    assert init_duration < 1000
+    drag_handle = table_locator.locator('tbody tr:nth-child(5) div.drag.handle')
+    drag_row_pk = drag_handle.get_attribute('pk')
+    start = perf_counter()
+    with page.expect_response(f'{live_server.url}/admin/testapp/book9/adminsortable2_update/') as response_info:
+        drag_handle.drag_to(table_locator.locator('tbody tr:nth-child(9)'))
+    while not (response := response_info.value):
+        sleep(0.1)
+    drag_duration = perf_counter() - start
+    record_property('drag_duration_ms', drag_duration * 1000)
+    assert response.ok
+    assert drag_duration < 3
+    assert is_table_ordered(table_locator.element_handle())
+    assert Book.objects.get(pk=drag_row_pk).my_order == 9
@@ -0,0 +1,112 @@
+import json
+import pytest
+
+from django.contrib import admin
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from adminsortable2.admin import SortableAdminMixin
+
+from testapp.models import Book1
+
+
+class InfiniteBookAdmin(SortableAdminMixin, admin.ModelAdmin):
+    infinite_scroll = True
+    list_per_page = 12
+    list_display = ['title', 'author', 'my_order']
+
+
+@pytest.fixture
+def model_admin():
+    return InfiniteBookAdmin(Book1, admin.site)
+
+
+def get_rows(model_admin, rf, admin_user, **params):
+    request = rf.get('/', params)
+    request.user = admin_user
+    return model_admin.changelist_rows_view(request)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params, orders, more', [
+    ({'after': 12}, list(range(13, 25)), True),
+    ({'after': 36, 'limit': 10}, list(range(37, 43)), False),
+    ({'before': 13, 'limit': 5}, list(range(8, 13)), True),
+    ({'before': 6}, list(range(1, 6)), False),
+    ({'after': 30, 'o': '-3'}, list(range(29, 17, -1)), True),
+    ({'before': 30, 'o': '-3', 'limit': 3}, [33, 32, 31], True),
+])
+def test_load_rows(model_admin, rf, admin_user, params, orders, more):
+    response = get_rows(model_admin, rf, admin_user, **params)
+    assert response.status_code == 200
+    content = json.loads(response.content)
+    assert [row['order'] for row in content['rows']] == orders
+    assert content['more'] is more
+    for row in content['rows']:
+        assert row['html'].startswith('<tr>')
+        assert f'<div class="drag handle" pk="{row["pk"]}" order="{row["order"]}">' in row['html']
+        assert f'name="_selected_action" value="{row["pk"]}"' in row['html']
+
+
+@pytest.mark.django_db
+def test_load_filtered_rows(model_admin, rf, admin_user):
+    author_id = Book1.objects.get(my_order=1).author_id
+    expected = list(Book1.objects.filter(author_id=author_id, my_order__gt=1).values_list('my_order', flat=True))
+    response = get_rows(model_admin, rf, admin_user, after=1, author__id__exact=author_id)
+    assert response.status_code == 200
+    assert [row['order'] for row in json.loads(response.content)['rows']] == expected[:12]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('query', [{}, {'o': '-3'}])
+def test_load_rows_with_duplicate_orders(model_admin, rf, admin_user, query):
+    Book1.objects.filter(my_order__in=range(10, 30)).update(my_order=10)
+    request = rf.get('/', query)
+    request.user = admin_user
+    expected = [str(pk) for pk in model_admin.get_changelist_instance(request).queryset.values_list('pk', flat=True)]
+    first, last = expected[0], expected[-1]
+
+    # walk through the list in both directions, passing the edge row each time
+    loaded, more = [first], True
+    while more:
+        order = Book1.objects.get(pk=loaded[-1]).my_order
+        response = get_rows(model_admin, rf, admin_user, after=order, last_pk=loaded[-1], limit=5, **query)
+        content = json.loads(response.content)
+        loaded.extend(row['pk'] for row in content['rows'])
+        more = content['more']
+    assert loaded == expected
+    loaded, more = [last], True
+    while more:
+        order = Book1.objects.get(pk=loaded[0]).my_order
+        response = get_rows(model_admin, rf, admin_user, before=order, last_pk=loaded[0], limit=5, **query)
+        content = json.loads(response.content)
+        loaded[:0] = [row['pk'] for row in content['rows']]
+        more = content['more']
+    assert loaded == expected
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', [{}, {'after': 1, 'before': 5}, {'after': ''}, {'after': 'x'},
+                                    {'after': 1, 'limit': 0}, {'after': 1, 'o': '1'}, {'after': 1, 'foo': 'bar'},
+                                    {'after': 1, 'last_pk': 'x'}])
+def test_load_rows_rejects_invalid_parameters(model_admin, rf, admin_user, params):
+    response = get_rows(model_admin, rf, admin_user, **params)
+    assert response.status_code == 400
+
+
+def test_rows_url_is_opt_in(model_admin):
+    assert 'testapp_book1_sortable_rows' in [pattern.name for pattern in model_admin.get_urls()]
+    model_admin.infinite_scroll = False
+    assert 'testapp_book1_sortable_rows' not in [pattern.name for pattern in model_admin.get_urls()]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', [{'after': 12}, {'before': 30, 'o': '-3'}])
+def test_load_rows_without_counting(model_admin, rf, admin_user, params):
+    with CaptureQueriesContext(connection) as context:
+        response = get_rows(model_admin, rf, admin_user, **params)
+    assert len(json.loads(response.content)['rows']) == 12
+    # neither counting the rows nor fetching a page of the changelist, only the rows following the given one
+    queries = [query['sql'] for query in context.captured_queries if 'FROM "testapp_book"' in query['sql']]
+    assert len(queries) == 1
+    assert 'COUNT(' not in queries[0]
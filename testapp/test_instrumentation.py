@@ -0,0 +1,75 @@
+import json
+import logging
+import pytest
+
+from django.core.management import call_command
+from django.test import Client
+from django.urls import reverse
+
+from adminsortable2.signals import order_operation
+
+from testapp.models import Book
+
+
+@pytest.fixture
+def operations():
+    received = []
+
+    def receiver(sender, **kwargs):
+        received.append(dict(kwargs, sender=sender))
+
+    order_operation.connect(receiver)
+    yield received
+    order_operation.disconnect(receiver)
+
+
+def ordered_pks():
+    return list(Book.objects.order_by('my_order').values_list('pk', flat=True))
+
+
+@pytest.mark.django_db
+def test_update_order_is_measured(operations, caplog):
+    pks = ordered_pks()
+    payload = json.dumps({'moves': [{'items': [pks[9]], 'before': pks[0]}]})
+    url = reverse('admin:testapp_book0_sortable_update')
+    with caplog.at_level(logging.DEBUG, logger='adminsortable2'):
+        response = Client().post(url, payload, content_type='application/json')
+    assert response.status_code == 200
+    move_item, update_order = operations
+    assert move_item['operation'] == 'move_item'
+    assert move_item['rows_shifted'] == 10
+    assert update_order['operation'] == 'update_order'
+    assert update_order['sender']._meta.model_name == 'book0'
+    assert update_order['label'] == 'testapp.Book0'
+    assert update_order['partition'] == {}
+    assert update_order['payload_size'] == len(payload)
+    assert update_order['rows_shifted'] == 10
+    assert update_order['rows_locked'] == 2 + 1 + 9
+    assert update_order['queries'] > move_item['queries'] > 0
+    assert update_order['duration'] >= move_item['duration'] > 0
+    assert update_order['failed'] is False
+    record = caplog.records[-1]
+    assert record.name == 'adminsortable2'
+    assert record.adminsortable2['operation'] == 'update_order'
+    assert record.getMessage().startswith('update_order on testapp.Book0 took')
+
+
+@pytest.mark.django_db
+def test_failed_update_is_measured(operations):
+    url = reverse('admin:testapp_book0_sortable_update')
+    response = Client().post(url, json.dumps({'updatedItems': [[999999, 1]]}), content_type='application/json')
+    assert response.status_code == 400
+    update_items, update_order = operations
+    assert update_items['operation'] == 'update_items'
+    assert update_items['failed'] is True
+    assert update_order['failed'] is True
+
+
+@pytest.mark.django_db
+def test_reorder_is_measured(operations):
+    Book.objects.filter(pk=ordered_pks()[0]).update(my_order=100)
+    call_command('reorder', 'testapp.Book1', verbosity=0)
+    reorder, = operations
+    assert reorder['operation'] == 'reorder'
+    assert reorder['partition'] is None
+    assert reorder['rows_shifted'] == Book.objects.count()
@@ -0,0 +1,158 @@
+import pytest
+
+from django.contrib import admin
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+
+from adminsortable2.admin import SortableAdminMixin
+from adminsortable2.paginator import KeysetPaginator
+
+from testapp.models import Book1, Book2
+
+
+class KeysetBookAdmin(SortableAdminMixin, admin.ModelAdmin):
+    keyset_pagination = True
+    list_per_page = 12
+
+
+@pytest.fixture
+def model_admin():
+    return KeysetBookAdmin(Book1, admin.site)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('order_by', ['my_order', '-my_order'])
+@pytest.mark.parametrize('orphans', [0, 7])
+def test_pages_match_offset_pagination(order_by, orphans):
+    queryset = Book1.objects.order_by(order_by)
+    paginator = Paginator(queryset, 12, orphans=orphans)
+    keyset_paginator = KeysetPaginator(queryset, 12, orphans=orphans, order_field='my_order')
+    assert keyset_paginator.descending == order_by.startswith('-')
+    for number in reversed(paginator.page_range):
+        assert list(keyset_paginator.page(number)) == list(paginator.page(number))
+    for index in range(paginator.count + 1):
+        item = keyset_paginator.get_item_at(index)
+        expected = next(iter(queryset.values_list('pk', 'my_order')[index:index + 1]), None)
+        assert item == expected
+
+
+@pytest.mark.django_db
+def test_page_is_fetched_without_offset():
+    paginator = KeysetPaginator(Book1.objects.order_by('my_order'), 12, order_field='my_order')
+    paginator.count
+    with CaptureQueriesContext(connection) as context:
+        books = list(paginator.page(3))
+    assert [book.my_order for book in books] == list(range(25, 37))
+    seek_query, page_query = [query['sql'] for query in context.captured_queries]
+    assert 'title' not in seek_query
+    assert 'OFFSET' not in page_query
+    with CaptureQueriesContext(connection) as context:
+        paginator.page(3)
+        paginator.get_item_at(26)
+    assert len(context.captured_queries) == 1
+
+
+@pytest.mark.django_db
+def test_falls_back_to_offset_pagination():
+    queryset = Book1.objects.order_by('title', '-pk')
+    paginator = KeysetPaginator(queryset, 12, order_field='my_order')
+    assert paginator.descending is None
+    assert list(paginator.page(2)) == list(Paginator(queryset, 12).page(2))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('order_by', ['my_order', '-my_order'])
+def test_seek_anchor_of_bulk_move(model_admin, order_by):
+    queryset = Book1.objects.order_by(order_by)
+    paginator = model_admin.get_paginator(None, queryset, 12)
+    pks = list(queryset.values_list('pk', flat=True))
+    for selection in [pks[:3], pks[10:14], pks[-5:], pks[5:40:7]]:
+        selected = list(queryset.filter(pk__in=selection))
+        others = queryset.exclude(pk__in=selection).values_list('pk', 'my_order')
+        for position in [0, 5, 12, 24, len(pks) - len(selection) - 1, len(pks) - len(selection)]:
+            expected = next(iter(others[position:position + 1]), None)
+            assert model_admin._seek_anchor(paginator, selected, position) == expected
+
+
+@pytest.mark.django_db
+def test_changelist_with_keyset_pagination(rf, admin_user):
+    model_admin = next(
+        model_admin for model, model_admin in admin.site._registry.items() if model._meta.model_name == 'book0'
+    )
+    request = rf.get('/', {'p': '3'})
+    request.user = admin_user
+    model_admin.keyset_pagination = True
+    try:
+        cl = model_admin.get_changelist_instance(request)
+    finally:
+        del model_admin.keyset_pagination
+    assert isinstance(cl.paginator, KeysetPaginator)
+    assert [book.my_order for book in cl.result_list] == list(range(25, 37))
+
+
+@pytest.mark.django_db
+def test_page_boundaries_are_cached(model_admin, rf, django_capture_on_commit_callbacks):
+    request = rf.get('/')
+    queryset = Book1.objects.order_by('my_order')
+    paginator = model_admin.get_paginator(request, queryset, 12)
+    assert paginator.num_pages == 4
+    assert paginator.get_item_at(30) == tuple(queryset.values_list('pk', 'my_order')[30])
+    with CaptureQueriesContext(connection) as context:
+        paginator = model_admin.get_paginator(request, queryset, 12)
+        assert paginator.num_pages == 4
+        paginator.get_boundary(3)
+    assert len(context.captured_queries) == 0
+    with django_capture_on_commit_callbacks(execute=True):
+        model_admin._move_item(1, 42, {})
+    expected = tuple(queryset.values_list('pk', 'my_order')[24])
+    with CaptureQueriesContext(connection) as context:
+        paginator = model_admin.get_paginator(request, queryset, 12)
+        assert paginator.get_boundary(3) == expected
+    # counting and seeking again
+    assert len(context.captured_queries) == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('command, options', [('reorder', {}), ('checkorder', {'repair': True})])
+def test_commands_discard_stale_page_boundaries(model_admin, rf, command, options, capsys):
+    request = rf.get('/')
+    queryset = Book1.objects.order_by('my_order')
+    model_admin.get_paginator(request, queryset, 12).get_boundary(3)
+    # bypassing the admin, the first five books are moved behind the others
+    Book1.objects.filter(my_order__lte=5).update(my_order=F('my_order') + 100)
+    call_command(command, 'testapp.Book1', verbosity=0, **options)
+    assert list(queryset.values_list('my_order', flat=True)) == list(range(1, 43))
+    paginator = model_admin.get_paginator(request, queryset, 12)
+    assert paginator.get_boundary(3) == tuple(queryset.values_list('pk', 'my_order')[24])
+
+
+@pytest.mark.django_db
+def test_proxy_models_share_the_version(model_admin, django_capture_on_commit_callbacks):
+    other_admin = KeysetBookAdmin(Book2, admin.site)
+    assert other_admin.get_order_version(None) == model_admin.get_order_version(None) == 0
+    with django_capture_on_commit_callbacks(execute=True):
+        model_admin._move_item(1, 42, {})
+    assert other_admin.get_order_version(None) == 1
+
+
+@pytest.mark.django_db
+def test_process_local_cache_is_not_used(model_admin, rf, settings, django_capture_on_commit_callbacks):
+    settings.ADMINSORTABLE2_CACHE = 'default'
+    caches['default'].clear()
+    request = rf.get('/')
+    queryset = Book1.objects.order_by('my_order')
+    paginator = model_admin.get_paginator(request, queryset, 12)
+    assert paginator.get_boundary(3) == tuple(queryset.values_list('pk', 'my_order')[24])
+    assert paginator.cache_key is None
+    assert model_admin.get_order_version(request) is None
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        model_admin._move_item(1, 42, {})
+    assert callbacks == []
+    assert model_admin.get_paginator(request, queryset, 12).get_boundary(3) == tuple(
+        queryset.values_list('pk', 'my_order')[24]
+    )
+    assert caches['default']._cache == {}
@@ -0,0 +1,125 @@
+import pytest
+
+from django.contrib import admin
+from django.db.models import F
+from django.db.models.signals import post_save
+
+from adminsortable2.admin import SortableAdminMixin
+from adminsortable2.signals import items_shifted
+
+from testapp.models import Book1
+
+
+class SignalsBookAdmin(SortableAdminMixin, admin.ModelAdmin):
+    pass
+
+
+class SetBasedBookAdmin(SortableAdminMixin, admin.ModelAdmin):
+    send_move_signals = False
+
+
+def ordered_pks():
+    return list(Book1.objects.order_by('my_order').values_list('pk', flat=True))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('admin_class', [SignalsBookAdmin, SetBasedBookAdmin])
+def test_move_item_to_top(admin_class):
+    model_admin = admin_class(Book1, admin.site)
+    pks = ordered_pks()
+    updated = model_admin._move_item(10, 1, {})
+    assert updated == {pk: order for order, pk in enumerate([pks[9]] + pks[:9], 1)}
+    assert ordered_pks() == [pks[9]] + pks[:9] + pks[10:]
+
+
+@pytest.mark.django_db
+def test_set_based_shift(django_assert_max_num_queries):
+    model_admin = SetBasedBookAdmin(Book1, admin.site)
+    pks = ordered_pks()
+    shifted, saved = [], []
+
+    def on_shifted(sender, **kwargs):
+        shifted.append(kwargs)
+
+    def on_saved(sender, instance, **kwargs):
+        saved.append(instance.pk)
+
+    items_shifted.connect(on_shifted, sender=Book1)
+    post_save.connect(on_saved, sender=Book1)
+    try:
+        with django_assert_max_num_queries(5):
+            assert model_admin._move_item(3, 30, {}, return_orders=False) == {pks[2]: 30}
+    finally:
+        items_shifted.disconnect(on_shifted, sender=Book1)
+        post_save.disconnect(on_saved, sender=Book1)
+    assert saved == [pks[2]]
+    assert len(shifted) == 1
+    assert (shifted[0]['start'], shifted[0]['end'], shifted[0]['delta'], shifted[0]['count']) == (4, 30, -1, 27)
+    assert ordered_pks() == pks[:2] + pks[3:30] + [pks[2]] + pks[30:]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('admin_class', [SignalsBookAdmin, SetBasedBookAdmin])
+@pytest.mark.parametrize('order_by', ['my_order', '-my_order'])
+@pytest.mark.parametrize('indexes, position', [
+    ([5], 0),
+    ([0, 1], 40),
+    ([3, 9, 10, 20], 7),
+    ([30, 2, 41], 12),
+    ([12, 13, 14], 12),
+    ([40, 0, 17], 100),
+])
+def test_move_items_to_position(rf, admin_class, order_by, indexes, position):
+    model_admin = admin_class(Book1, admin.site)
+    pks = list(Book1.objects.order_by(order_by).values_list('pk', flat=True))
+    selected = [pks[index] for index in sorted(indexes)]
+    queryset = Book1.objects.filter(pk__in=selected)
+    updated = model_admin._move_items_to_position(rf.post('/'), queryset, position, order_by)
+    remaining = [pk for pk in pks if pk not in selected]
+    expected = remaining[:position] + selected + remaining[position:]
+    assert list(Book1.objects.order_by(order_by).values_list('pk', flat=True)) == expected
+    orders = dict(Book1.objects.values_list('pk', 'my_order'))
+    assert sorted(orders.values()) == list(range(1, 43))
+    assert updated == {pk: order for pk, order in orders.items() if pk in updated}
+    assert set(updated) == {pk for pk, order in orders.items() if pks.index(pk) != expected.index(pk)}
+
+
+@pytest.mark.django_db
+def test_set_based_move_items(rf, django_assert_max_num_queries):
+    model_admin = SetBasedBookAdmin(Book1, admin.site)
+    pks = ordered_pks()
+    selected = pks[4:40:2]
+    shifted, saved = [], []
+
+    def on_shifted(sender, **kwargs):
+        shifted.append((kwargs['start'], kwargs['end'], kwargs['delta']))
+
+    def on_saved(sender, instance, **kwargs):
+        saved.append(instance.pk)
+
+    items_shifted.connect(on_shifted, sender=Book1)
+    post_save.connect(on_saved, sender=Book1)
+    try:
+        # locking the selected items, seeking the anchor, checking the span, shifting and moving
+        with django_assert_max_num_queries(7):
+            queryset = Book1.objects.filter(pk__in=selected)
+            model_admin._move_items_to_position(rf.post('/'), queryset, 0, 'my_order', return_orders=False)
+    finally:
+        items_shifted.disconnect(on_shifted, sender=Book1)
+        post_save.disconnect(on_saved, sender=Book1)
+    assert saved == []
+    assert shifted == [(1, 4, 18)] + [(order, order, 18 - index) for index, order in enumerate(range(6, 40, 2), 1)]
+    assert ordered_pks() == selected + [pk for pk in pks if pk not in selected]
+
+
+@pytest.mark.django_db
+def test_set_based_move_items_with_gaps(rf):
+    model_admin = SetBasedBookAdmin(Book1, admin.site)
+    Book1.objects.filter(my_order__gt=20).update(my_order=F('my_order') + 100)
+    pks = ordered_pks()
+    orders = sorted(Book1.objects.values_list('my_order', flat=True))
+    queryset = Book1.objects.filter(pk__in=[pks[30], pks[35]])
+    model_admin._move_items_to_position(rf.post('/'), queryset, 2, 'my_order')
+    assert ordered_pks() == pks[:2] + [pks[30], pks[35]] + pks[2:30] + pks[31:35] + pks[36:]
+    # the positions of the span are reassigned, keeping the gap
+    assert sorted(Book1.objects.values_list('my_order', flat=True)) == orders
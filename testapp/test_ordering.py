@@ -0,0 +1,52 @@
+import random
+
+from adminsortable2.ordering import DenseOrdering, LexicographicOrdering, SparseOrdering
+
+
+def test_dense():
+    ordering = DenseOrdering()
+    assert ordering.after(None) == 1
+    assert ordering.after(7) == 8
+    assert ordering.between(3, 4) is None
+    assert ordering.sequence(3) == [1, 2, 3]
+
+
+def test_sparse():
+    ordering = SparseOrdering(gap=16)
+    assert ordering.sequence(3) == [16, 32, 48]
+    assert ordering.between(None, 16) == 8
+    assert ordering.between(16, 32) == 24
+    assert ordering.between(16, 17) is None
+    assert ordering.between(32, None) == 48
+    assert ordering.spread(16, 32, 3) == [20, 24, 28]
+    assert ordering.spread(16, 19, 3) is None
+
+
+def test_lexicographic_keys_stay_ordered():
+    ordering = LexicographicOrdering()
+    keys = ordering.sequence(3)
+    assert keys == sorted(keys)
+    rng = random.Random(42)
+    for _ in range(500):
+        index = rng.randint(0, len(keys))
+        lower = keys[index - 1] if index > 0 else None
+        upper = keys[index] if index < len(keys) else None
+        key = ordering.between(lower, upper)
+        assert lower is None or lower < key
+        assert upper is None or key < upper
+        assert not key.endswith('0')
+        keys.insert(index, key)
+    assert keys == sorted(keys)
+
+
+def test_lexicographic_between_adjacent_keys():
+    ordering = LexicographicOrdering()
+    assert ordering.between('1', '2') == '1V'
+    assert ordering.between('A', 'A1') == 'A0V'
+    assert ordering.between('A', 'A') is None
+    assert ordering.spread('1', '2', 3) == sorted(ordering.spread('1', '2', 3))
+
+
+def test_position_of_index():
+    for ordering in [DenseOrdering(), SparseOrdering(gap=16), LexicographicOrdering(width=1, gap=20)]:
+        assert [ordering.position(index) for index in range(1, 8)] == ordering.sequence(7)
@@ -0,0 +1,133 @@
+import json
+import pytest
+
+from django.contrib import admin
+from django.core.management import call_command
+from django.test import Client
+from django.urls import reverse
+
+from adminsortable2.admin import SortableAdminMixin
+from adminsortable2.ordering import LexicographicOrdering, SparseOrdering
+
+from testapp.models import Book, Book1, Note
+from testapp.test_add_sortable import chapter_form_data
+
+
+# Upper bounds on the number of queries of each request, including those of the admin itself, such as
+# loading the user. Each operation is run with a few and with many items, so that issuing a query per
+# item exceeds its budget. Saving an inline inserts each new row on its own, hence its budget grows by
+# one query per row. Bulk moves with sparse and lexicographic positions are measured without the request,
+# since those strategies are not used by an admin of the testapp.
+QUERY_BUDGETS = {
+    'changelist': 16,
+    'single_drag': 10,
+    'multi_drag': 11,
+    'move_to_page': 11,
+    'inline_save': 10,
+    'sparse_bulk_move': 6,
+    'lexicographic_bulk_move': 6,
+}
+
+
+class SparseBookAdmin(SortableAdminMixin, admin.ModelAdmin):
+    order_strategy = SparseOrdering(gap=1024)
+
+
+class NoteAdmin(SortableAdminMixin, admin.ModelAdmin):
+    pass
+
+
+def ordered_pks(model=Book):
+    return list(model.objects.order_by('my_order').values_list('pk', flat=True))
+
+
+def post_moves(moves):
+    url = reverse('admin:testapp_book0_sortable_update')
+    return Client().post(url, json.dumps({'moves': moves}), content_type='application/json')
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('query_string', ['', '?p=2', '?p=4'])
+def test_changelist_budget(query_string, django_assert_max_num_queries):
+    url = reverse('admin:testapp_book0_changelist') + query_string
+    with django_assert_max_num_queries(QUERY_BUDGETS['changelist']):
+        response = Client().get(url)
+    assert response.status_code == 200
+    assert b'class="drag handle"' in response.content
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('distance', [1, 40])
+def test_single_drag_budget(distance, django_assert_max_num_queries):
+    pks = ordered_pks()
+    with django_assert_max_num_queries(QUERY_BUDGETS['single_drag']):
+        response = post_moves([{'items': [pks[distance]], 'before': pks[0]}])
+    assert response.status_code == 200
+    assert ordered_pks()[0] == pks[distance]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('num_items', [2, 20])
+def test_multi_drag_budget(num_items, django_assert_max_num_queries):
+    pks = ordered_pks()
+    with django_assert_max_num_queries(QUERY_BUDGETS['multi_drag']):
+        response = post_moves([{'items': pks[-num_items:], 'before': pks[0]}])
+    assert response.status_code == 200
+    assert ordered_pks() == pks[-num_items:] + pks[:-num_items]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('num_items', [2, 6])
+def test_move_to_page_budget(num_items, django_assert_max_num_queries):
+    pks = ordered_pks()
+    url = reverse('admin:testapp_book0_changelist') + '?p=4'
+    data = {'action': 'move_to_first_page', '_selected_action': pks[-num_items:], 'index': 0}
+    with django_assert_max_num_queries(QUERY_BUDGETS['move_to_page']):
+        response = Client().post(url, data)
+    assert response.status_code == 302
+    assert ordered_pks() == pks[-num_items:] + pks[:-num_items]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('num_rows', [1, 20])
+def test_inline_save_budget(num_rows, django_assert_max_num_queries):
+    book = Book.objects.get(title="Django for APIs")
+    num_chapters = book.chapter_set.count()
+    titles = [f"Chapter {index}" for index in range(num_rows)]
+    data = {
+        'title': book.title,
+        'author': book.author_id,
+        '_save': "Save",
+        **chapter_form_data(book, titles),
+    }
+    with django_assert_max_num_queries(QUERY_BUDGETS['inline_save'] + num_rows):
+        response = Client().post(reverse('admin:testapp_book3_change', args=(book.id,)), data)
+    assert response.status_code == 302
+    assert list(book.chapter_set.order_by('my_order').values_list('title', flat=True)[num_chapters:]) == titles
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('num_items', [2, 20])
+def test_sparse_bulk_move_budget(num_items, rf, django_assert_max_num_queries):
+    call_command('reorder', 'testapp.Book1', gap=1024, verbosity=0)
+    model_admin = SparseBookAdmin(Book1, admin.site)
+    pks = ordered_pks()
+    queryset = Book1.objects.filter(pk__in=pks[-num_items:])
+    with django_assert_max_num_queries(QUERY_BUDGETS['sparse_bulk_move']):
+        model_admin._move_items_to_position(rf.post('/'), queryset, 0, 'my_order')
+    assert ordered_pks() == pks[-num_items:] + pks[:-num_items]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('num_items', [2, 20])
+def test_lexicographic_bulk_move_budget(num_items, rf, django_assert_max_num_queries):
+    model_admin = NoteAdmin(Note, admin.site)
+    assert isinstance(model_admin.order_strategy, LexicographicOrdering)
+    Note.objects.bulk_create(
+        Note(text=f"Note {index}", my_order=key) for index, key in enumerate(model_admin.order_strategy.sequence(40))
+    )
+    pks = ordered_pks(Note)
+    queryset = Note.objects.filter(pk__in=pks[-num_items:])
+    with django_assert_max_num_queries(QUERY_BUDGETS['lexicographic_bulk_move']):
+        model_admin._move_items_to_position(rf.post('/'), queryset, 0, 'my_order')
+    assert ordered_pks(Note) == pks[-num_items:] + pks[:-num_items]
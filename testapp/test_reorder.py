@@ -0,0 +1,109 @@
+import pytest
+import random
+
+from django.core.management import call_command
+from django.db.models import F
+
+from adminsortable2.consistency import renumber
+from adminsortable2.ordering import DenseOrdering
+
+from testapp.models import Book1, Chapter, Chapter1
+
+
+def ordered_pks():
+    return list(Book1.objects.order_by('my_order', 'pk').values_list('pk', flat=True))
+
+
+@pytest.mark.django_db
+def test_reorder_skips_correct_rows(django_assert_max_num_queries):
+    pks = ordered_pks()
+    Book1.objects.filter(pk__in=pks[:3]).update(my_order=0)
+    Book1.objects.filter(pk=pks[-1]).update(my_order=1000)
+    # reading the rows once in each direction, and writing those moving towards the start or the end
+    with django_assert_max_num_queries(8):
+        call_command('reorder', 'testapp.Book1', verbosity=0)
+    assert list(Book1.objects.order_by('my_order').values_list('my_order', flat=True)) == list(range(1, len(pks) + 1))
+    assert ordered_pks() == sorted(pks[:3]) + pks[3:]
+
+
+@pytest.mark.django_db
+def test_reorder_dry_run(capsys):
+    pks = ordered_pks()
+    Book1.objects.filter(pk__in=pks[5:8]).update(my_order=100)
+    call_command('reorder', 'testapp.Book1', dry_run=True)
+    assert '37 rows of model "testapp.Book1" require reordering' in capsys.readouterr().out
+    assert Book1.objects.filter(my_order=100).count() == 3
+
+
+@pytest.mark.django_db
+def test_reorder_in_batches(capsys):
+    pks = ordered_pks()
+    call_command('reorder', 'testapp.Book1', gap=10, batch_size=20, verbosity=2)
+    output = capsys.readouterr().out
+    assert 'Reordered 20 of 42 rows' in output
+    assert 'Reordered 42 of 42 rows' in output
+    assert list(Book1.objects.order_by('my_order').values_list('my_order', flat=True)) == list(range(10, 430, 10))
+    assert ordered_pks() == pks
+
+
+def chapter_orders():
+    orders = {}
+    for book_id, my_order in Chapter1.objects.order_by('book', 'my_order', 'pk').values_list('book', 'my_order'):
+        orders.setdefault(book_id, []).append(my_order)
+    return orders
+
+
+@pytest.mark.django_db
+def test_reorder_detects_inline_partitions():
+    Chapter1.objects.filter(book_id=35, my_order__gte=5).update(my_order=F('my_order') + 10)
+    call_command('reorder', 'testapp.Chapter1', verbosity=0)
+    for orders in chapter_orders().values():
+        assert orders == list(range(1, len(orders) + 1))
+
+
+@pytest.mark.django_db
+def test_reorder_only_defective_partitions(capsys):
+    Chapter1.objects.filter(book_id=36, my_order=3).update(my_order=2)
+    call_command('reorder', 'testapp.Chapter1', partition_by=['book'], only_defective=True, dry_run=True)
+    assert '1 rows of model "testapp.Chapter1" require reordering' in capsys.readouterr().out
+    call_command('reorder', 'testapp.Chapter1', partition_by=['book'], only_defective=True, verbosity=0)
+    assert chapter_orders()[36] == list(range(1, 18))
+
+
+@pytest.mark.django_db
+def test_reorder_without_partition():
+    call_command('reorder', 'testapp.Chapter1', no_partition=True, verbosity=0)
+    orders = [order for orders in chapter_orders().values() for order in orders]
+    assert sorted(orders) == list(range(1, Chapter1.objects.count() + 1))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('batch_size', [1, 4, 1000])
+def test_renumber_in_chunks_keeps_sequence(batch_size):
+    rand = random.Random(batch_size)
+    for book in Book1.objects.all():
+        book.my_order = rand.choice([0, 0, 1, 2, 2, 3, 40, 41, 41, 500])
+        book.save(update_fields=['my_order'])
+    expected = list(Book1.objects.order_by('my_order', 'pk').values_list('pk', flat=True))
+    previous = dict(Book1.objects.values_list('pk', 'my_order'))
+    num_updated = renumber(Book1.objects.all(), 'my_order', DenseOrdering(), batch_size=batch_size)
+    orders = dict(Book1.objects.values_list('pk', 'my_order'))
+    assert [orders[pk] for pk in expected] == list(range(1, len(expected) + 1))
+    assert num_updated == sum(1 for pk, order in orders.items() if previous[pk] != order)
+    assert renumber(Book1.objects.all(), 'my_order', DenseOrdering(), dry_run=True) == 0
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('batch_size', [3, 1000])
+def test_renumber_partitions_in_chunks(batch_size):
+    Chapter.objects.filter(book_id=35).update(book=None)
+    Chapter.objects.filter(book_id=36, my_order__gt=4).update(my_order=F('my_order') - 3)
+    Chapter.objects.filter(book_id=37).update(my_order=F('my_order') * 5)
+    expected = {}
+    for pk, book_id in Chapter.objects.order_by('book', 'my_order', 'pk').values_list('pk', 'book'):
+        expected.setdefault(book_id, []).append(pk)
+    num_rows = renumber(Chapter1.objects.all(), 'my_order', DenseOrdering(), ['book'], dry_run=True)
+    assert renumber(Chapter1.objects.all(), 'my_order', DenseOrdering(), ['book'], batch_size=batch_size) == num_rows
+    orders = dict(Chapter.objects.values_list('pk', 'my_order'))
+    for pks in expected.values():
+        assert [orders[pk] for pk in pks] == list(range(1, len(pks) + 1))
@@ -0,0 +1,90 @@
+import pytest
+
+from django.contrib import admin
+from django.core.management import call_command
+
+from adminsortable2.admin import SortableAdminMixin
+from adminsortable2.ordering import SparseOrdering
+
+from testapp.models import Book1
+
+
+class SparseBookAdmin(SortableAdminMixin, admin.ModelAdmin):
+    order_strategy = SparseOrdering(gap=1024)
+
+
+@pytest.fixture
+def model_admin():
+    call_command('reorder', 'testapp.Book1', gap=1024, verbosity=0)
+    return SparseBookAdmin(Book1, admin.site)
+
+
+def ordered_pks():
+    return list(Book1.objects.order_by('my_order').values_list('pk', flat=True))
+
+
+@pytest.mark.django_db
+def test_reorder_with_gap(model_admin):
+    orders = list(Book1.objects.order_by('my_order').values_list('my_order', flat=True))
+    assert orders == [1024 * n for n in range(1, len(orders) + 1)]
+
+
+@pytest.mark.django_db
+def test_move_to_top_updates_one_row(model_admin, django_assert_max_num_queries):
+    pks = ordered_pks()
+    last = Book1.objects.get(pk=pks[-1])
+    with django_assert_max_num_queries(6):
+        updated = model_admin._move_item(last.my_order, 1024, {})
+    assert updated == {last.pk: 512}
+    assert ordered_pks() == [pks[-1]] + pks[:-1]
+
+
+@pytest.mark.django_db
+def test_move_rebalances_exhausted_gap(model_admin):
+    Book1.objects.filter(my_order=1024).update(my_order=1)
+    pks = ordered_pks()
+    updated = model_admin._move_item(Book1.objects.get(pk=pks[5]).my_order, 1, {})
+    assert len(updated) > 1
+    assert ordered_pks() == [pks[5]] + pks[:5] + pks[6:]
+    orders = list(Book1.objects.order_by('my_order').values_list('my_order', flat=True))
+    assert len(set(orders)) == len(orders)
+
+
+@pytest.mark.django_db
+def test_update_order_writes_moved_rows_only(model_admin):
+    pks = ordered_pks()
+    # the client posts the new sequence of the dragged span
+    updated_items = [[pks[3], 1], [pks[0], 2], [pks[1], 3], [pks[2], 4]]
+    assert model_admin._update_order(updated_items, {}) == {pks[3]: 512}
+    assert ordered_pks()[:4] == [pks[3], pks[0], pks[1], pks[2]]
+    assert Book1.objects.get(pk=pks[0]).my_order == 1024
+
+
+@pytest.mark.django_db
+def test_add_book_appends_with_gap(model_admin):
+    max_order = Book1.objects.order_by('my_order').last().my_order
+    book = Book1(title="Fluent Python")
+    model_admin.save_model(None, book, None, False)
+    assert book.my_order == max_order + 1024
+
+
+@pytest.mark.django_db
+def test_move_items_to_position(model_admin, rf):
+    pks = ordered_pks()
+    selected = [pks[20], pks[2], pks[30]]
+    queryset = Book1.objects.filter(pk__in=selected)
+    updated = model_admin._move_items_to_position(rf.post('/'), queryset, 12, 'my_order')
+    assert set(updated) == set(selected)
+    selected.sort(key=pks.index)
+    remaining = [pk for pk in pks if pk not in selected]
+    assert ordered_pks() == remaining[:12] + selected + remaining[12:]
+
+
+@pytest.mark.django_db
+def test_relative_move_updates_one_row(model_admin, rf, admin_user):
+    pks = ordered_pks()
+    request = rf.post('/')
+    request.user = admin_user
+    updated = model_admin._apply_moves(request, [{'items': [pks[0]], 'before': pks[5]}], {})
+    assert updated == {pks[0]: 5632}
+    assert ordered_pks() == pks[1:5] + [pks[0]] + pks[5:]
@@ -0,0 +1,190 @@
+import json
+import pytest
+
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from testapp.models import Book
+
+
+def ordered_pks():
+    return list(Book.objects.order_by('my_order').values_list('pk', flat=True))
+
+
+def post_update(payload, slug='book0'):
+    url = reverse(f'admin:testapp_{slug}_sortable_update')
+    return Client().post(url, json.dumps(payload), content_type='application/json')
+
+
+@pytest.mark.django_db
+def test_update_order(settings):
+    settings.DEBUG = True
+    pks = ordered_pks()
+    # drag the 10th item onto the top of the list
+    updated_items = [[str(pk), order] for order, pk in enumerate([pks[9]] + pks[:9], 1)]
+    response = post_update({'updatedItems': updated_items})
+    assert response.status_code == 200
+    assert response.json()['updated'] == 10
+    assert response.json()['orders'] == {str(pk): order for pk, order in updated_items}
+    assert int(response['X-Query-Count']) <= 5
+    assert ordered_pks() == [pks[9]] + pks[:9] + pks[10:]
+
+
+@pytest.mark.django_db
+def test_update_order_rejects_unknown_items():
+    pks = ordered_pks()
+    response = post_update({'updatedItems': [[pks[0], 2], [999999, 1]]})
+    assert response.status_code == 400
+    assert b"Unknown items 999999" in response.content
+    assert ordered_pks() == pks
+
+
+@pytest.mark.django_db
+def test_update_order_rejects_duplicate_items():
+    pks = ordered_pks()
+    response = post_update({'updatedItems': [[pks[0], 2], [pks[0], 1]]})
+    assert response.status_code == 400
+    assert ordered_pks() == pks
+
+
+@pytest.mark.django_db
+def test_update_order_rejects_stale_sequence():
+    pks = ordered_pks()
+    older = {'moves': [{'items': [pks[0]], 'after': pks[2]}], 'sequence': 1, 'client': 'abc'}
+    newer = {'moves': [{'items': [pks[5]], 'before': pks[0]}], 'sequence': 2, 'client': 'abc'}
+    other = {'moves': [{'items': [pks[9]], 'after': pks[0]}], 'sequence': 1, 'client': 'xyz'}
+    # the newer batch overtakes the older one, interleaved with a batch of another page
+    assert post_update(newer).status_code == 200
+    assert post_update(other).status_code == 200
+    response = post_update(older)
+    assert response.status_code == 409
+    assert response.content == b"Ignored stale update 1"
+    # a batch delivered twice is applied only once
+    assert post_update(newer).status_code == 409
+    assert ordered_pks()[:11] == [pks[5], pks[0], pks[9]] + pks[1:5] + pks[6:9] + [pks[10]]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('orders', [[2, 2], [1, 3], [2, 99], [0, 1]])
+def test_update_order_rejects_other_positions(orders):
+    pks = ordered_pks()
+    response = post_update({'updatedItems': [[pks[0], orders[0]], [pks[1], orders[1]]]})
+    assert response.status_code == 400
+    assert b"Posted positions differ from the current positions of these items" in response.content
+    assert list(Book.objects.order_by('my_order').values_list('my_order', flat=True)) == list(range(1, 43))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('move, expected', [
+    (lambda pks: {'items': [pks[9]], 'before': pks[0]}, lambda pks: [pks[9]] + pks[:9] + pks[10:]),
+    (lambda pks: {'items': [pks[0]], 'after': pks[9]}, lambda pks: pks[1:10] + [pks[0]] + pks[10:]),
+    (lambda pks: {'items': [pks[0]], 'before': pks[9]}, lambda pks: pks[1:9] + [pks[0]] + pks[9:]),
+    (lambda pks: {'items': [pks[9]], 'after': pks[0]}, lambda pks: pks[:1] + [pks[9]] + pks[1:9] + pks[10:]),
+    (lambda pks: {'items': [pks[1]], 'after': pks[0]}, lambda pks: pks),
+    (lambda pks: {'items': [pks[2], pks[7]], 'before': pks[4]}, lambda pks: pks[:2] + pks[3:4] + [pks[2], pks[7]] + pks[4:7] + pks[8:]),
+])
+def test_relative_moves(move, expected):
+    pks = ordered_pks()
+    response = post_update({'moves': [move(pks)]})
+    assert response.status_code == 200
+    assert ordered_pks() == expected(pks)
+
+
+@pytest.mark.django_db
+def test_relative_moves_are_applied_in_sequence():
+    pks = ordered_pks()
+    moves = [{'items': [pks[5]], 'before': pks[0]}, {'items': [pks[0]], 'after': pks[6]}]
+    response = post_update({'moves': moves})
+    assert response.status_code == 200
+    assert response.json()['updated'] == 7
+    assert ordered_pks() == [pks[5]] + pks[1:5] + [pks[6], pks[0]] + pks[7:]
+
+
+@pytest.mark.django_db
+def test_relative_move_rejects_invalid_anchor():
+    pks = ordered_pks()
+    for move in [{'items': [pks[0]], 'before': pks[0]}, {'items': [pks[0]], 'after': 999999}]:
+        assert post_update({'moves': [move]}).status_code == 400
+    assert ordered_pks() == pks
+
+
+@pytest.mark.django_db
+def test_update_order_returns_final_positions(django_capture_on_commit_callbacks):
+    pks = ordered_pks()
+    with django_capture_on_commit_callbacks(execute=True):
+        response = post_update({'moves': [{'items': [pks[0]], 'after': pks[2]}], 'version': 0})
+    assert response.json()['updated'] == 3
+    assert response.json()['orders'] == {str(pks[1]): 1, str(pks[2]): 2, str(pks[0]): 3}
+    assert response.json()['outdated'] is False
+    # the version is incremented after committing, but the response already carries it
+    assert response.json()['version'] == 1
+    response = Client().get(reverse('admin:testapp_book0_changelist'))
+    assert b'"version": 1,' in response.content
+    with django_capture_on_commit_callbacks(execute=True):
+        response = post_update({'moves': [{'items': [pks[0]], 'after': pks[2]}], 'version': 0})
+    assert response.json() == {'updated': 0, 'orders': {}, 'version': 1, 'outdated': True}
+
+
+@pytest.mark.django_db
+def test_version_with_atomic_requests(monkeypatch, django_capture_on_commit_callbacks):
+    monkeypatch.setitem(connection.settings_dict, 'ATOMIC_REQUESTS', True)
+    pks = ordered_pks()
+    version = 0
+    for anchor in pks[2:5]:
+        with django_capture_on_commit_callbacks(execute=True):
+            response = post_update({'moves': [{'items': [pks[0]], 'after': anchor}], 'version': version})
+        assert response.status_code == 200
+        assert response.json()['outdated'] is False
+        assert response.json()['version'] == version + 1
+        version = response.json()['version']
+    assert ordered_pks()[:5] == pks[1:5] + [pks[0]]
+
+
+@pytest.mark.django_db
+def test_version_without_shared_cache(settings, django_capture_on_commit_callbacks):
+    settings.ADMINSORTABLE2_CACHE = 'default'
+    pks = ordered_pks()
+    response = Client().get(reverse('admin:testapp_book0_changelist'))
+    assert b'"version": null,' in response.content
+    # a version posted by a page rendered by another process does not force a reload
+    for version in [None, 5]:
+        with django_capture_on_commit_callbacks(execute=True):
+            response = post_update({'moves': [{'items': [pks[0]], 'after': pks[2]}], 'version': version})
+        assert response.json()['version'] is None
+        assert response.json()['outdated'] is False
+
+
+def post_move(payload, slug='book0'):
+    url = reverse(f'admin:testapp_{slug}_sortable_move')
+    return Client().post(url, json.dumps(payload), content_type='application/json')
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('position, index', [('top', 0), (1, 0), (30, 29), (42, 41), (1000, 41), ('bottom', 41)])
+def test_move_to_position(position, index, django_assert_max_num_queries):
+    pks = ordered_pks()
+    # independent of the distance: user, savepoints, locking, seeking and shifting
+    with django_assert_max_num_queries(12):
+        response = post_move({'pk': pks[5], 'position': position})
+    assert response.status_code == 200
+    remaining = pks[:5] + pks[6:]
+    assert ordered_pks() == remaining[:index] + [pks[5]] + remaining[index:]
+    assert response.json()['orders'][str(pks[5])] == index + 1
+
+
+@pytest.mark.django_db
+def test_move_to_position_of_reversed_list():
+    pks = list(Book.objects.order_by('-my_order').values_list('pk', flat=True))
+    response = post_move({'pk': pks[0], 'position': 3}, slug='book2')
+    assert response.status_code == 200
+    assert list(Book.objects.order_by('-my_order').values_list('pk', flat=True)) == pks[1:3] + pks[:1] + pks[3:]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('position', [0, -3, 'middle', None])
+def test_move_to_invalid_position(position):
+    pks = ordered_pks()
+    response = post_move({'pk': pks[5], 'position': position})
+    assert response.status_code == 400
+    assert ordered_pks() == pks